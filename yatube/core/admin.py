@@ -0,0 +1,43 @@
+"""
+Приложение core отвечает за общие части проекта.
+Реализация работы админки.
+"""
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Mail, Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'args',
+        'status',
+        'attempts',
+        'run_at',
+        'created'
+    )
+    list_filter = ('status', 'name')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        """Возвращает задачи в очередь с новым запасом попыток."""
+        queryset.update(
+            status=Task.PENDING, attempts=0, locked_by='',
+            run_at=timezone.now()
+        )
+    retry.short_description = 'Повторить выбранные задачи'
+
+
+class MailAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'created',
+        'locked_by',
+        'locked_at'
+    )
+
+
+admin.site.register(Task, TaskAdmin)
+admin.site.register(Mail, MailAdmin)
@@ -3,8 +3,13 @@
 при ошибках в запросах к страницам.
 """
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     """Регистрация приложения about."""
     name = 'core'
+
+    def ready(self):
+        from .sqlite import configure_sqlite
+        connection_created.connect(configure_sqlite)
@@ -0,0 +1,260 @@
+"""
+Приложение core отвечает за общие части проекта.
+В cache.py реализованы бэкенды кеша для нескольких процессов.
+
+RedisCache хранит кеш в Redis, общем для всех процессов сайта:
+отрисованные фрагменты и счётчики версий видны каждому процессу,
+а сброс кеша доходит до всех. Нужен пакет redis.
+
+TwoTierCache — ближний кеш в памяти процесса перед общим кешем.
+Прочитанные значения живут в памяти NEAR_TIMEOUT секунд, поэтому
+частые ключи не ходят в общий кеш на каждом запросе. Запись,
+удаление и incr идут в общий кеш и сразу обновляют ближний;
+другие процессы увидят изменение не позже чем через NEAR_TIMEOUT.
+"""
+import pickle
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+from ..metrics import record_cache
+
+INCR_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('incrby', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+_missing = object()
+
+
+class RedisCache(BaseCache):
+    """
+    Кеш в Redis. LOCATION — адрес вида redis://host:6379/0,
+    OPTIONS без MAX_ENTRIES и CULL_FREQUENCY передаются клиенту redis.
+    Целые числа хранятся как есть, чтобы incr выполнялся в Redis.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        try:
+            import redis
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                'Для RedisCache нужен пакет redis.'
+            ) from error
+        options = {
+            name.lower(): value
+            for name, value in params.get('OPTIONS', {}).items()
+            if name not in ('MAX_ENTRIES', 'CULL_FREQUENCY')
+        }
+        self._client = redis.Redis.from_url(server, **options)
+        self._incr = self._client.register_script(INCR_SCRIPT)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _timeout(self, timeout):
+        """Срок жизни в секундах или None для вечного ключа."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout), 0)
+
+    def _dump(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _load(self, data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if timeout == 0:
+            return False
+        return bool(self._client.set(
+            self._key(key, version), self._dump(value), ex=timeout, nx=True
+        ))
+
+    def get(self, key, default=None, version=None):
+        data = self._client.get(self._key(key, version))
+        return default if data is None else self._load(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, timeout = self._key(key, version), self._timeout(timeout)
+        if timeout == 0:
+            self._client.delete(key)
+        else:
+            self._client.set(key, self._dump(value), ex=timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key, timeout = self._key(key, version), self._timeout(timeout)
+        if timeout is None:
+            return bool(self._client.persist(key))
+        return bool(self._client.expire(key, timeout))
+
+    def delete(self, key, version=None):
+        self._client.delete(self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self._client.mget(
+            [self._key(key, version) for key in keys]
+        )
+        return {
+            key: self._load(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        with self._client.pipeline() as pipe:
+            for key, value in data.items():
+                key = self._key(key, version)
+                if timeout == 0:
+                    pipe.delete(key)
+                else:
+                    pipe.set(key, self._dump(value), ex=timeout)
+            pipe.execute()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        value = self._incr(keys=[self._key(key, version)], args=[delta])
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        # Только ключи этого кеша: make_key начинает каждый ключ
+        # с KEY_PREFIX и двоеточия, даже при пустом префиксе.
+        # Остальные данные базы Redis не трогаются.
+        batch = []
+        for key in self._client.scan_iter(
+            match=f'{self.key_prefix}:*', count=1000
+        ):
+            batch.append(key)
+            if len(batch) >= 1000:
+                self._client.delete(*batch)
+                batch = []
+        if batch:
+            self._client.delete(*batch)
+
+
+class TwoTierCache(BaseCache):
+    """
+    Ближний кеш в памяти процесса перед общим кешем.
+    LOCATION — имя общего кеша в CACHES, OPTIONS: NEAR_TIMEOUT
+    (секунды, по умолчанию 5) и NEAR_MAX_ENTRIES (по умолчанию 1000).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.near_timeout = options.get('NEAR_TIMEOUT', 5)
+        self.near = LocMemCache(f'near:{location}', {
+            'OPTIONS': {
+                'MAX_ENTRIES': options.get('NEAR_MAX_ENTRIES', 1000),
+            },
+        })
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _near_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        if timeout is None:
+            return self.near_timeout
+        return min(timeout, self.near_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self.near.set(key, value, self._near_timeout(timeout), version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self.near.get(key, _missing, version)
+        if value is not _missing:
+            record_cache(1)
+            return value
+        value = self.shared.get(key, _missing, version)
+        if value is _missing:
+            record_cache(0, 1)
+            return default
+        record_cache(1)
+        self.near.set(key, value, self.near_timeout, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self.near.set(key, value, self._near_timeout(timeout), version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version)
+        self.near.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.near.get_many(keys, version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            self.near.set_many(shared, self.near_timeout, version)
+            found.update(shared)
+        record_cache(len(found), len(keys) - len(found))
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.near.set_many(
+            {key: value for key, value in data.items() if key not in failed},
+            self._near_timeout(timeout),
+            version
+        )
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.shared.delete_many(keys, version)
+        self.near.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.near.has_key(key, version)
+            or self.shared.has_key(key, version)
+        )
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version)
+        self.near.set(key, value, self.near_timeout, version)
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        self.near.clear()
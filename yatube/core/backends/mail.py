@@ -0,0 +1,143 @@
+"""
+Приложение core отвечает за общие части проекта.
+В mail.py реализован бэкенд почты с очередью отправки.
+
+QueuedEmailBackend не отправляет письма сам: он записывает их
+в таблицу Mail одной вставкой и ставит в очередь фоновых задач
+(core/tasks.py) задачу отправки, поэтому запрос, отправляющий письмо,
+не ждёт почтовый сервер. Задача забирает письма пачками по
+EMAIL_BATCH_SIZE и отправляет все накопившиеся письма через одно
+соединение бэкенда EMAIL_DELIVERY_BACKEND (SMTP, файлы и т. д.).
+Письмо удаляется из таблицы после отправки; при ошибке пачка
+возвращается в очередь, и задача повторяется, поэтому письмо может
+дойти дважды, но не потеряется.
+Письма с вложениями отправляются сразу, без очереди.
+Без очереди задач (TASKS_EAGER) отправка выполняется после фиксации
+транзакции, а её ошибка пишется в лог: письма остаются в таблице
+и уйдут со следующей отправкой.
+"""
+import json
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Mail
+from ..tasks import enqueue
+
+logger = logging.getLogger(__name__)
+
+
+def dump_message(message):
+    """Письмо в виде JSON для хранения в очереди."""
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'content_subtype': message.content_subtype,
+    }, ensure_ascii=False)
+
+
+def load_message(data):
+    """Письмо, восстановленное из dump_message."""
+    data = json.loads(data)
+    content_subtype = data.pop('content_subtype')
+    data['alternatives'] = [tuple(item) for item in data['alternatives']]
+    message = EmailMultiAlternatives(**data)
+    message.content_subtype = content_subtype
+    return message
+
+
+def claim_mail(worker, limit):
+    """Забирает отправителю worker до limit писем из очереди."""
+    now = timezone.now()
+    Mail.objects.filter(
+        locked_at__lt=now - timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+    ).update(locked_by='', locked_at=None)
+    ready = list(
+        Mail.objects.filter(locked_by='').order_by('pk').values_list(
+            'pk', flat=True
+        )[:limit]
+    )
+    if not ready:
+        return []
+    Mail.objects.filter(pk__in=ready, locked_by='').update(
+        locked_by=worker, locked_at=now
+    )
+    return list(Mail.objects.filter(locked_by=worker).order_by('pk'))
+
+
+def deliver_mail():
+    """
+    Фоновая задача: отправляет все письма из очереди через одно
+    соединение. Возвращает число отправленных писем.
+    """
+    worker = uuid.uuid4().hex
+    batch = claim_mail(worker, settings.EMAIL_BATCH_SIZE)
+    if not batch:
+        return 0
+    sent = 0
+    try:
+        with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+            while batch:
+                connection.send_messages(
+                    [load_message(mail.message) for mail in batch]
+                )
+                Mail.objects.filter(
+                    pk__in=[mail.pk for mail in batch]
+                ).delete()
+                sent += len(batch)
+                batch = claim_mail(worker, settings.EMAIL_BATCH_SIZE)
+    except Exception:
+        Mail.objects.filter(locked_by=worker).update(
+            locked_by='', locked_at=None
+        )
+        raise
+    return sent
+
+
+def deliver_mail_logged():
+    """Отправка писем без очереди задач: ошибка не ломает запрос."""
+    try:
+        deliver_mail()
+    except Exception:
+        logger.exception('Не удалось отправить письма из очереди')
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Бэкенд почты, ставящий письма в очередь отправки."""
+
+    def send_messages(self, email_messages):
+        queued = [
+            message for message in email_messages
+            if message.recipients() and not message.attachments
+        ]
+        direct = [
+            message for message in email_messages
+            if message.recipients() and message.attachments
+        ]
+        if direct:
+            get_connection(
+                settings.EMAIL_DELIVERY_BACKEND,
+                fail_silently=self.fail_silently
+            ).send_messages(direct)
+        if queued:
+            Mail.objects.bulk_create(
+                Mail(message=dump_message(message)) for message in queued
+            )
+            if settings.TASKS_EAGER:
+                transaction.on_commit(deliver_mail_logged)
+            else:
+                enqueue(deliver_mail)
+        return len(queued) + len(direct)
@@ -0,0 +1,83 @@
+"""
+Приложение core отвечает за общие части проекта.
+В concurrency.py независимые запросы к базе выполняются одновременно.
+
+gather(первый, второй, ...) вызывает функции в общем пуле потоков
+CONCURRENT_QUERY_WORKERS и возвращает их результаты по порядку,
+исключение первой упавшей функции поднимается в вызывающем потоке.
+Первая функция выполняется в текущем потоке. У каждого потока пула
+своё соединение с базой, поэтому внутри транзакции (в том числе
+в тестах) функции выполняются по очереди: другое соединение
+не увидело бы её изменений. Потоки пула читают из той же базы,
+что и запрос (см. core.routers), и получают обёртки execute_wrapper
+его соединений, поэтому их запросы попадают в замеры запроса.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import metrics
+from .routers import pin_to_primary, pinned_to_primary
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                settings.CONCURRENT_QUERY_WORKERS,
+                thread_name_prefix='queries'
+            )
+        return _pool
+
+
+def in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all())
+
+
+def call_in_worker(call, pinned, stats, wrappers):
+    """Выполняет call в потоке пула с настройками запроса."""
+    pin_to_primary(pinned)
+    metrics.attach(stats)
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(wrapper)
+                    )
+            return call()
+    finally:
+        metrics.finish_request()
+        pin_to_primary(False)
+        close_old_connections()
+
+
+def gather(*calls):
+    """Результаты функций calls, выполненных одновременно."""
+    if (
+        len(calls) < 2
+        or settings.CONCURRENT_QUERY_WORKERS < 1
+        or in_transaction()
+    ):
+        return [call() for call in calls]
+    wrappers = {
+        connection.alias: list(connection.execute_wrappers)
+        for connection in connections.all()
+    }
+    pool = get_pool()
+    futures = [
+        pool.submit(
+            call_in_worker, call, pinned_to_primary(), metrics.current(),
+            wrappers
+        )
+        for call in calls[1:]
+    ]
+    return [calls[0]()] + [future.result() for future in futures]
@@ -0,0 +1,105 @@
+"""
+Приложение core отвечает за общие части проекта.
+Команда исполнителя фоновых задач (core/tasks.py).
+
+С --processes N запускается N процессов-исполнителей: задачи
+выполняются параллельно, а каждое побочное действие идёт в своём
+процессе, не занимая процессы сайта. SIGTERM и SIGINT завершают
+работу после текущей задачи.
+"""
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import work
+
+
+SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class Stop:
+    """
+    Флаг остановки, взводимый сигналом.
+    На выходе из блока with прежние обработчики сигналов возвращаются.
+    """
+
+    def __init__(self, handler=None):
+        self.requested = False
+        self.handler = handler
+
+    def __enter__(self):
+        self.previous = [signal.getsignal(signum) for signum in SIGNALS]
+        for signum in SIGNALS:
+            signal.signal(signum, self.request)
+        return self
+
+    def __exit__(self, *exc_info):
+        for signum, previous in zip(SIGNALS, self.previous):
+            signal.signal(signum, previous)
+
+    def request(self, signum, frame):
+        self.requested = True
+        if self.handler is not None:
+            self.handler()
+
+    def __call__(self):
+        return self.requested
+
+
+def run_worker(batch, once, results):
+    with Stop() as stop:
+        results.put(dict(work(batch, once, stop)))
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов-исполнителей.'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=20,
+            help='Сколько задач процесс забирает за раз.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и выйти.'
+        )
+
+    def handle(self, *args, **options):
+        batch, once = options['batch'], options['once']
+        if options['processes'] <= 1:
+            with Stop() as stop:
+                self.report(work(batch, once, stop))
+            return
+        # Дочерние процессы не должны делить соединения с родителем.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=run_worker, args=(batch, once, results))
+            for _ in range(options['processes'])
+        ]
+        for process in workers:
+            process.start()
+        total = {}
+        # Сигнал родителю пересылается исполнителям, и они
+        # заканчивают работу после текущей задачи.
+        with Stop(lambda: [process.terminate() for process in workers]):
+            for _ in workers:
+                for key, value in results.get().items():
+                    total[key] = total.get(key, 0) + value
+            for process in workers:
+                process.join()
+        self.report(total)
+
+    def report(self, done):
+        self.stdout.write(
+            'Выполнено задач: {}, с ошибкой: {}'.format(
+                done.get('done', 0), done.get('failed', 0)
+            )
+        )
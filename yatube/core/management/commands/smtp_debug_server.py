@@ -0,0 +1,55 @@
+"""
+Приложение core отвечает за общие части проекта.
+Команда запускает отладочный SMTP-сервер (core/smtp.py).
+
+Принятые письма сохраняются по одному в файлы .eml в EMAIL_FILE_PATH
+и кратко выводятся в консоль.
+"""
+import os
+import uuid
+from email import message_from_bytes, policy
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.smtp import DebuggingSMTPServer
+
+
+class Command(BaseCommand):
+    help = 'Отладочный SMTP-сервер: письма сохраняются в файлы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default=settings.EMAIL_HOST)
+        parser.add_argument('--port', type=int, default=settings.EMAIL_PORT)
+        parser.add_argument('--directory', default=settings.EMAIL_FILE_PATH)
+
+    def handle(self, *args, **options):
+        directory = options['directory']
+        os.makedirs(directory, exist_ok=True)
+
+        def save(sender, recipients, data):
+            name = '{}-{}.eml'.format(
+                timezone.now().strftime('%Y%m%d-%H%M%S'), uuid.uuid4().hex
+            )
+            with open(os.path.join(directory, name), 'wb') as file:
+                file.write(data)
+            self.stdout.write('{} → {}: {}'.format(
+                sender, ', '.join(recipients),
+                message_from_bytes(data, policy=policy.default)['Subject']
+            ))
+
+        server = DebuggingSMTPServer(
+            (options['host'], options['port']), save
+        )
+        self.stdout.write(
+            'SMTP-сервер слушает {}:{}, письма сохраняются в {}'.format(
+                options['host'], options['port'], directory
+            )
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
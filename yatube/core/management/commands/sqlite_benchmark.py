@@ -0,0 +1,153 @@
+"""
+Приложение core отвечает за общие части проекта.
+Команда сравнивает скорость чтения SQLite во время записи
+с настройками по умолчанию и с SQLITE_PRAGMAS.
+
+Во временном файле создаются таблицы постов и комментариев;
+читатели в отдельных потоках выбирают страницы ленты
+и комментарии, а писатели вставляют комментарии пачками.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, pub_date REAL, text TEXT)',
+    'CREATE INDEX post_date_idx ON post (pub_date, id)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'created REAL, text TEXT)',
+    'CREATE INDEX comment_post_idx ON comment (post_id, created)',
+)
+
+PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтение SQLite во время записи '
+        'без настроек и с SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument(
+            '--burst',
+            type=int,
+            default=50,
+            help='Сколько комментариев вставлять в одной транзакции.'
+        )
+
+    def handle(self, *args, **options):
+        for title, pragmas in (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.prepare(path, pragmas, options['rows'])
+                reads, writes, errors = self.measure(path, pragmas, options)
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{title}: чтений в секунду — {reads / seconds:.0f}, '
+                f'записей в секунду — {writes / seconds:.0f}, '
+                f'ошибок блокировки — {errors}'
+            )
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(connection, pragmas)
+        return connection
+
+    def prepare(self, path, pragmas, rows):
+        connection = self.connect(path, pragmas)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+            ((now - number, f'Запись {number}') for number in range(rows))
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def measure(self, path, pragmas, options):
+        """Число чтений, записанных строк и ошибок блокировки."""
+        self.stop = threading.Event()
+        self.totals = Counter()
+        self.lock = threading.Lock()
+        threads = [
+            threading.Thread(target=self.reader, args=(path, pragmas, options))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=self.writer, args=(path, pragmas, options))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        totals = self.totals
+        return totals['reads'], totals['writes'], totals['errors']
+
+    def add(self, name, value=1):
+        with self.lock:
+            self.totals[name] += value
+
+    def reader(self, path, pragmas, options):
+        """Читает случайные страницы ленты и комментарии первого поста."""
+        connection = self.connect(path, pragmas)
+        while not self.stop.is_set():
+            offset = random.randrange(options['rows'] - PAGE)
+            try:
+                posts = connection.execute(
+                    'SELECT id, text FROM post ORDER BY pub_date DESC, '
+                    'id DESC LIMIT ? OFFSET ?', (PAGE, offset)
+                ).fetchall()
+                connection.execute(
+                    'SELECT text FROM comment WHERE post_id = ? '
+                    'ORDER BY created LIMIT 20', (posts[0][0],)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                self.add('errors')
+            else:
+                self.add('reads')
+        connection.close()
+
+    def writer(self, path, pragmas, options):
+        """Вставляет комментарии пачками по --burst в одной транзакции."""
+        connection = self.connect(path, pragmas)
+        while not self.stop.is_set():
+            post_id = random.randrange(1, options['rows'])
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT INTO comment (post_id, created, text) '
+                    'VALUES (?, ?, ?)',
+                    ((post_id, time.time(), 'Комментарий')
+                     for _ in range(options['burst']))
+                )
+                connection.execute('COMMIT')
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                self.add('errors')
+            else:
+                self.add('writes', options['burst'])
+        connection.close()
@@ -0,0 +1,266 @@
+"""
+Приложение core отвечает за общие части проекта.
+В metrics.py собираются замеры запросов к сайту.
+
+Для каждого запроса считаются запросы к базе и их время, время
+отрисовки шаблонов, попадания и промахи кеша и общее время ответа.
+Замеры копятся в гистограммах по имени представления в памяти
+процесса (у каждого процесса сайта свои) и отдаются страницей
+/metrics/ в текстовом формате Prometheus или в JSON.
+Медленные запросы пишутся в журнал core.metrics вместе с их SQL.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'yatube'
+
+TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'request_duration_seconds': ('Время ответа', TIME_BUCKETS),
+    'db_queries': ('Запросов к базе за запрос', COUNT_BUCKETS),
+    'db_duration_seconds': ('Время запросов к базе', TIME_BUCKETS),
+    'template_duration_seconds': ('Время отрисовки шаблонов', TIME_BUCKETS),
+}
+COUNTERS = {
+    'cache_hits_total': 'Попадания в кеш',
+    'cache_misses_total': 'Промахи кеша',
+    'slow_requests_total': 'Медленные запросы',
+}
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Замеры одного запроса."""
+
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'template_depth',
+        'cache_hits', 'cache_misses', 'sql'
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.sql = []
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper: время и текст запроса."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += duration
+            if len(self.sql) < settings.METRICS_SLOW_SQL_LIMIT:
+                self.sql.append((duration, sql))
+
+
+@contextmanager
+def measure_queries(stats):
+    """Считает запросы на всех соединениях потока в stats."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(stats.execute_wrapper)
+            )
+        yield
+
+
+def start_request():
+    return attach(RequestStats())
+
+
+def attach(stats):
+    """Замеры stats копятся в текущем потоке (None — не копятся)."""
+    _local.stats = stats
+    return stats
+
+
+def finish_request():
+    _local.stats = None
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return getattr(_local, 'stats', None)
+
+
+def record_cache(hits, misses=0):
+    """Отмечает попадания и промахи кеша в текущем запросе."""
+    stats = current()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+def timed_render(render):
+    """
+    Обёртка render шаблона: время отрисовки в текущем запросе.
+    Вложенная отрисовка не считается второй раз.
+    """
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        stats = current()
+        if stats is None:
+            return render(*args, **kwargs)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+    return wrapper
+
+
+def instrument_templates():
+    """Подключает замер отрисовки к шаблонам Django."""
+    from django.template.backends.django import Template
+    if not hasattr(Template.render, '__wrapped__'):
+        Template.render = timed_render(Template.render)
+
+
+class Histogram:
+    """Гистограмма Prometheus: накопленные счётчики по корзинам."""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+
+
+class Registry:
+    """Гистограммы и счётчики по имени представления."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {name: {} for name in HISTOGRAMS}
+            self.counters = {name: {} for name in COUNTERS}
+
+    def observe(self, view, duration, stats):
+        values = {
+            'request_duration_seconds': duration,
+            'db_queries': stats.queries,
+            'db_duration_seconds': stats.db_time,
+            'template_duration_seconds': stats.template_time,
+        }
+        slow = duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS
+        with self.lock:
+            for name, value in values.items():
+                histograms = self.histograms[name]
+                if view not in histograms:
+                    histograms[view] = Histogram(HISTOGRAMS[name][1])
+                histograms[view].observe(value)
+            for name, value in (
+                ('cache_hits_total', stats.cache_hits),
+                ('cache_misses_total', stats.cache_misses),
+                ('slow_requests_total', int(slow)),
+            ):
+                counters = self.counters[name]
+                counters[view] = counters.get(view, 0) + value
+        return slow
+
+    def as_dict(self):
+        """Замеры для JSON, сгруппированные по представлениям."""
+        with self.lock:
+            views = {}
+            for name, histograms in self.histograms.items():
+                for view, histogram in histograms.items():
+                    views.setdefault(view, {})[name] = {
+                        'count': histogram.count,
+                        'sum': round(histogram.total, 6),
+                        'buckets': dict(histogram.cumulative()),
+                    }
+            for name, counters in self.counters.items():
+                for view, value in counters.items():
+                    views.setdefault(view, {})[name] = value
+            return views
+
+    def as_prometheus(self):
+        """Замеры в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, histograms in self.histograms.items():
+                metric = f'{PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {HISTOGRAMS[name][0]}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histogram in sorted(histograms.items()):
+                    label = f'view="{escape(view)}"'
+                    for bound, count in histogram.cumulative():
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{bound}"}} {count}'
+                        )
+                    lines.append(
+                        f'{metric}_bucket{{{label},le="+Inf"}} '
+                        f'{histogram.count}'
+                    )
+                    lines.append(f'{metric}_sum{{{label}}} {histogram.total}')
+                    lines.append(
+                        f'{metric}_count{{{label}}} {histogram.count}'
+                    )
+            for name, counters in self.counters.items():
+                metric = f'{PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {COUNTERS[name]}')
+                lines.append(f'# TYPE {metric} counter')
+                for view, value in sorted(counters.items()):
+                    lines.append(f'{metric}{{view="{escape(view)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = Registry()
+
+
+def log_slow_request(request, view, duration, stats):
+    logger.warning(
+        'Медленный запрос %s %s (%s): %.0f мс, запросов к базе %d '
+        '(%.0f мс), шаблоны %.0f мс\n%s',
+        request.method, request.get_full_path(), view,
+        duration * 1000, stats.queries, stats.db_time * 1000,
+        stats.template_time * 1000,
+        '\n'.join(
+            f'{sql_time * 1000:8.1f} мс  {sql}' for sql_time, sql in stats.sql
+        )
+    )
@@ -0,0 +1,75 @@
+"""
+Приложение core отвечает за общие части проекта.
+В middleware.py закрепляется чтение за основной базой после записи
+и собираются замеры каждого запроса.
+"""
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+from .routers import pin_to_primary, wrote_to_primary
+
+PIN_COOKIE = 'pin_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Пользователь видит свои изменения сразу (read-your-writes).
+    Запросы POST и другие изменяющие, а также запросы в течение
+    REPLICA_PIN_SECONDS после записи читают из основной базы:
+    отметка о записи хранится в cookie браузера.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_to_primary(
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+            if wrote_to_primary():
+                response.set_cookie(
+                    PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True,
+                    samesite='Lax'
+                )
+            return response
+        finally:
+            pin_to_primary(False)
+
+
+class InstrumentationMiddleware:
+    """
+    Замеры запроса: запросы к базе на всех соединениях, шаблоны,
+    кеш и общее время. Стоит первым, чтобы время включало все
+    остальные middleware. Отключается настройкой METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        metrics.instrument_templates()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with metrics.measure_queries(stats):
+                response = self.get_response(request)
+        finally:
+            metrics.finish_request()
+        duration = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        if metrics.registry.observe(view, duration, stats):
+            metrics.log_slow_request(request, view, duration, stats)
+        return response
@@ -0,0 +1,102 @@
+"""
+Приложение core отвечает за общие части проекта.
+В models.py описаны очереди фоновых задач и писем.
+"""
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Модель для фоновой задачи: вызов функции с аргументами."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Функция'
+    )
+    args = models.TextField(
+        default='[]',
+        verbose_name='Аргументы (JSON)'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Состояние'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Наибольшее число попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить после'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлена в очередь'
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    locked_by = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Исполнитель'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='task_status_run_idx'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.name}{self.args}'
+
+
+class Mail(models.Model):
+    """Модель для письма, ждущего отправки (core/backends/mail.py)."""
+    message = models.TextField(
+        verbose_name='Письмо (JSON)'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Поставлено в очередь'
+    )
+    locked_by = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Отправитель'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взято в отправку'
+    )
+
+    class Meta:
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Письма'
+
+    def __str__(self):
+        return f'Письмо {self.pk}'
@@ -0,0 +1,61 @@
+"""
+Приложение core отвечает за общие части проекта.
+В routers.py реализована маршрутизация запросов к базам данных.
+
+Запись всегда идёт в основную базу default, чтение — в одну из реплик
+DATABASE_REPLICAS. Чтение возвращается в основную базу, если в этом
+потоке уже была запись, если запрос закреплён за основной базой
+(см. core.middleware.ReplicaPinningMiddleware) или если модель
+из PRIMARY_APPS: без сессий из основной базы свежевошедший
+пользователь оказался бы разлогинен из-за отставания реплики.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+PRIMARY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def pin_to_primary(pinned=True):
+    """Закрепляет чтение текущего потока за основной базой."""
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def wrote_to_primary():
+    """Была ли запись в основную базу после pin_to_primary."""
+    return getattr(_state, 'wrote', False)
+
+
+def pinned_to_primary():
+    """Читает ли текущий поток из основной базы."""
+    return getattr(_state, 'pinned', False) or wrote_to_primary()
+
+
+class PrimaryReplicaRouter:
+    """Маршрутизатор: запись в основную базу, чтение из реплик."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            not settings.DATABASE_REPLICAS
+            or model._meta.app_label in PRIMARY_APPS
+            or pinned_to_primary()
+        ):
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
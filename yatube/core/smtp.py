@@ -0,0 +1,107 @@
+"""
+Приложение core отвечает за общие части проекта.
+В smtp.py реализован отладочный SMTP-сервер.
+
+Сервер принимает письма по SMTP без авторизации и шифрования
+и ничего никуда не пересылает: каждое письмо отдаётся функции
+handle_message(отправитель, получатели, текст письма). Он заменяет
+настоящий почтовый сервер при разработке (команда smtp_debug_server)
+и в тестах отправки почты. Модуль smtpd из стандартной библиотеки
+устарел и удалён в Python 3.12, поэтому сервер написан отдельно;
+он понимает только команды, которыми пользуется smtplib.
+"""
+import socketserver
+import threading
+
+
+def address(argument):
+    """Адрес из аргумента вида FROM:<user@example.com>."""
+    return argument.partition(':')[2].strip().split(' ')[0].strip('<>')
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Одно SMTP-соединение; команда X выполняется методом smtp_X."""
+
+    def reply(self, code, text):
+        self.wfile.write(f'{code} {text}\r\n'.encode())
+
+    def handle(self):
+        self.server.count_connection()
+        self.reply(220, 'yatube debugging SMTP server')
+        self.reset()
+        self.done = False
+        while not self.done:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode(
+                'utf-8', 'replace'
+            ).strip().partition(' ')
+            method = getattr(self, 'smtp_' + command.upper(), None)
+            if method is None:
+                self.reply(502, 'Command not implemented')
+            else:
+                method(argument)
+
+    def smtp_HELO(self, argument):
+        self.reply(250, 'localhost')
+
+    smtp_EHLO = smtp_HELO
+
+    def smtp_MAIL(self, argument):
+        self.sender, self.recipients = address(argument), []
+        self.reply(250, 'OK')
+
+    def smtp_RCPT(self, argument):
+        self.recipients.append(address(argument))
+        self.reply(250, 'OK')
+
+    def smtp_DATA(self, argument):
+        if self.sender is None or not self.recipients:
+            self.reply(503, 'Bad sequence of commands')
+            return
+        self.reply(354, 'End data with <CR><LF>.<CR><LF>')
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b'.\r\n':
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        self.server.handle_message(
+            self.sender, self.recipients, b''.join(lines)
+        )
+        self.reset()
+        self.reply(250, 'OK')
+
+    def reset(self):
+        self.sender, self.recipients = None, []
+
+    def smtp_RSET(self, argument):
+        self.reset()
+        self.reply(250, 'OK')
+
+    def smtp_NOOP(self, argument):
+        self.reply(250, 'OK')
+
+    def smtp_QUIT(self, argument):
+        self.reply(221, 'Bye')
+        self.done = True
+
+
+class DebuggingSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    SMTP-сервер, отдающий письма handle_message.
+    connections — сколько соединений было открыто.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, server_address, handle_message):
+        super().__init__(server_address, SMTPHandler)
+        self.handle_message = handle_message
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def count_connection(self):
+        with self.lock:
+            self.connections += 1
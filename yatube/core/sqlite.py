@@ -0,0 +1,26 @@
+"""
+Приложение core отвечает за общие части проекта.
+В sqlite.py настраивается каждое новое соединение с SQLite.
+
+По умолчанию SQLite пишет через журнал отката: пока идёт запись,
+читать базу нельзя, и запись комментария или подписки задерживает
+чтение ленты. В режиме WAL читатели работают параллельно с писателем.
+Остальные настройки SQLITE_PRAGMAS: synchronous=NORMAL (в режиме WAL
+безопасно и без fsync на каждую транзакцию), кеш страниц, отображение
+файла в память и ожидание вместо ошибки «database is locked».
+"""
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполняет PRAGMA name = value для каждой настройки."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает соединение SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
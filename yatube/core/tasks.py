@@ -0,0 +1,140 @@
+"""
+Приложение core отвечает за общие части проекта.
+В tasks.py реализована очередь фоновых задач в базе данных.
+
+enqueue(функция, *аргументы) записывает вызов в таблицу Task в той же
+транзакции, что и изменение, которое его вызвало: задача видна
+исполнителю только после фиксации и пропадает вместе с откатом.
+Запрос на запись тратит на побочное действие одну вставку строки,
+а само действие выполняет команда run_tasks в отдельных процессах.
+Упавшая задача повторяется с растущей задержкой TASKS_RETRY_SECONDS,
+после TASKS_MAX_ATTEMPTS попыток остаётся в таблице со статусом
+«не выполнена». Задачи исполнителя, пропавшего дольше чем на
+TASKS_LEASE_SECONDS, возвращаются в очередь, поэтому задачи должны
+спокойно переносить повторный запуск.
+
+При TASKS_EAGER задачи выполняются сразу при вызове enqueue
+(разработка и тесты).
+"""
+import json
+import logging
+import time
+import traceback
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__name__}'
+
+
+def enqueue(func, *args):
+    """
+    Ставит вызов func(*args) в очередь.
+    func — функция уровня модуля, args — значения, переводимые в JSON.
+    """
+    if settings.TASKS_EAGER:
+        func(*args)
+        return None
+    return Task.objects.create(
+        name=task_name(func),
+        args=json.dumps(args),
+        max_attempts=settings.TASKS_MAX_ATTEMPTS
+    )
+
+
+def claim(worker, limit):
+    """
+    Забирает исполнителю worker до limit готовых к запуску задач.
+    Условие на статус в UPDATE не даёт двум исполнителям взять
+    одну задачу.
+    """
+    now = timezone.now()
+    Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASKS_LEASE_SECONDS)
+    ).update(status=Task.PENDING, locked_by='')
+    ready = list(
+        Task.objects.filter(
+            status=Task.PENDING, run_at__lte=now
+        ).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+    )
+    if not ready:
+        return []
+    Task.objects.filter(pk__in=ready, status=Task.PENDING).update(
+        status=Task.RUNNING, locked_by=worker, started=now
+    )
+    return list(
+        Task.objects.filter(
+            locked_by=worker, status=Task.RUNNING
+        ).order_by('run_at', 'id')
+    )
+
+
+def run(task):
+    """
+    Выполняет задачу. Удачная задача удаляется из таблицы,
+    упавшая возвращается в очередь или помечается невыполненной.
+    Возвращает True при успехе.
+    Задача выполняется без общей транзакции: в SQLite транзакция,
+    которая сначала читает, а потом пишет, при занятой другим
+    процессом записи сразу падает с «database is locked», не дожидаясь
+    busy_timeout. Прерванная задача безопасно выполняется заново.
+    """
+    try:
+        import_string(task.name)(*json.loads(task.args))
+    except Exception:
+        task.attempts += 1
+        task.error = traceback.format_exc()
+        task.locked_by = ''
+        if task.attempts >= task.max_attempts:
+            task.status = Task.FAILED
+            logger.exception('Задача %s не выполнена', task)
+        else:
+            delay = settings.TASKS_RETRY_SECONDS * 2 ** (task.attempts - 1)
+            task.status = Task.PENDING
+            task.run_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(
+                'Задача %s упала, повтор через %d с', task, delay,
+                exc_info=True
+            )
+        task.save()
+        return False
+    task.delete()
+    return True
+
+
+def work(batch, once=False, stopped=lambda: False):
+    """
+    Цикл исполнителя: забирает задачи пачками по batch и выполняет их.
+    Пустая очередь опрашивается раз в TASKS_POLL_SECONDS; с once
+    цикл заканчивается, как только очередь опустела.
+    Возвращает счётчики выполненных и упавших задач.
+    """
+    worker = uuid.uuid4().hex
+    done = Counter()
+    while not stopped():
+        tasks = claim(worker, batch)
+        if not tasks:
+            if once:
+                break
+            time.sleep(settings.TASKS_POLL_SECONDS)
+            continue
+        for index, task in enumerate(tasks):
+            if stopped():
+                # Невзятые задачи сразу возвращаются в очередь.
+                Task.objects.filter(
+                    pk__in=[rest.pk for rest in tasks[index:]]
+                ).update(status=Task.PENDING, locked_by='')
+                break
+            done['done' if run(task) else 'failed'] += 1
+    return done
@@ -1,10 +1,48 @@
 """
 Тест, написанный с помощью модуля unittest.
-Проверяет корректную работу views.py.
+Проверяет корректную работу views.py, бэкендов кеша,
+маршрутизации запросов к базам данных, настройки SQLite,
+очереди фоновых задач и очереди писем.
 """
+import socket
+import threading
+from email import message_from_bytes
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+
+from core import metrics
+from core.backends.mail import dump_message, load_message
+from core.concurrency import gather
+from core.metrics import registry
+from core.middleware import PIN_COOKIE, ReplicaPinningMiddleware
+from core.models import Mail, Task
+from core.smtp import DebuggingSMTPServer
+from core.tasks import enqueue
+from posts.models import FeedEntry, Follow, Post, User
+from posts.search import search_posts
+
+
+CALLS = []
+
+
+def remember(*args):
+    """Задача для тестов очереди."""
+    CALLS.append(args)
+
+
+def broken():
+    raise ValueError('сломано')
 
 
 class ViewTestClass(TestCase):
@@ -16,3 +54,361 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertEqual(response, 'core/404.html')
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'core.backends.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'NEAR_TIMEOUT': 60},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-test',
+    },
+})
+class TwoTierCacheTest(TestCase):
+    """Класс проверяет ближний кеш перед общим."""
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_reads_are_served_from_near_cache(self):
+        caches['default'].set('key', 'старое')
+        caches['shared'].set('key', 'из другого процесса')
+        self.assertEqual(caches['default'].get('key'), 'старое')
+        caches['default'].near.clear()
+        self.assertEqual(
+            caches['default'].get('key'), 'из другого процесса'
+        )
+
+    def test_writes_go_to_shared_cache(self):
+        caches['default'].set('key', 1)
+        self.assertEqual(caches['default'].incr('key'), 2)
+        self.assertEqual(caches['shared'].get('key'), 2)
+        self.assertEqual(caches['default'].get('key'), 2)
+        caches['default'].delete('key')
+        self.assertIsNone(caches['shared'].get('key'))
+        self.assertIsNone(caches['default'].get('key'))
+        with self.assertRaises(ValueError):
+            caches['default'].incr('key')
+
+    def test_get_many_fills_near_cache(self):
+        caches['shared'].set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            caches['default'].get_many(['a', 'b', 'c']), {'a': 1, 'b': 2}
+        )
+        self.assertEqual(caches['default'].near.get('a'), 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(TestCase):
+    """Класс проверяет чтение из реплик и закрепление за основной базой."""
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+
+    def serve(self, request, write=False):
+        def view(request):
+            self.reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+                self.reads.append(router.db_for_read(Post))
+            return HttpResponse()
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_reads_go_to_replica(self):
+        response = self.serve(self.factory.get('/'))
+        self.assertEqual(self.reads, ['replica1'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Session), 'default')
+
+    def test_writes_pin_reads_to_primary(self):
+        self.serve(self.factory.post('/'))
+        response = self.serve(self.factory.get('/'), write=True)
+        self.assertEqual(self.reads, ['default', 'replica1', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.serve(request)
+        self.assertEqual(self.reads[-1], 'default')
+
+
+class SQLiteTuningTest(TestCase):
+    """Класс проверяет настройку соединений с SQLite."""
+    def test_connection_uses_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_benchmark_reports_both_modes(self):
+        out = StringIO()
+        call_command(
+            'sqlite_benchmark', seconds=0.1, rows=100, readers=1, writers=1,
+            stdout=out
+        )
+        self.assertIn('по умолчанию: чтений в секунду', out.getvalue())
+        self.assertIn('SQLITE_PRAGMAS: чтений в секунду', out.getvalue())
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        registry.reset()
+        self.staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_requests_are_measured(self):
+        self.client.get('/')
+        metrics = self.client.get('/metrics/?format=json').json()
+        index = metrics['posts:index']
+        self.assertEqual(index['request_duration_seconds']['count'], 1)
+        self.assertGreater(index['db_queries']['sum'], 0)
+        self.assertGreater(index['template_duration_seconds']['sum'], 0)
+        self.assertGreater(
+            index['cache_hits_total'] + index['cache_misses_total'], 0
+        )
+
+    def test_prometheus_text(self):
+        self.client.get('/')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/plain')
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            text
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 1', text
+        )
+
+    def test_metrics_are_admin_only(self):
+        self.client.logout()
+        self.assertEqual(
+            self.client.get('/metrics/').status_code, HTTPStatus.FORBIDDEN
+        )
+        with override_settings(METRICS_TOKEN='secret'):
+            response = self.client.get(
+                '/metrics/', HTTP_AUTHORIZATION='Bearer secret'
+            )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get('/')
+        self.assertIn('SELECT', logs.output[0])
+        self.assertEqual(
+            registry.as_dict()['posts:index']['slow_requests_total'], 1
+        )
+
+
+@override_settings(CONCURRENT_QUERY_WORKERS=2)
+class ConcurrentQueriesTest(TransactionTestCase):
+    """Класс проверяет одновременное выполнение запросов к базе."""
+    def setUp(self):
+        User.objects.create_user(username='reader')
+
+    def test_calls_run_in_pool_threads(self):
+        (first, _), (second, users) = gather(
+            lambda: (threading.current_thread().name, None),
+            lambda: (
+                threading.current_thread().name, User.objects.count()
+            )
+        )
+        self.assertEqual(first, threading.current_thread().name)
+        self.assertTrue(second.startswith('queries'))
+        self.assertEqual(users, 1)
+
+    def test_calls_run_in_order_inside_transaction(self):
+        with transaction.atomic():
+            User.objects.create_user(username='writer')
+            names = gather(
+                lambda: threading.current_thread().name,
+                lambda: User.objects.filter(username='writer').exists()
+            )
+        self.assertEqual(names, [threading.current_thread().name, True])
+
+    def test_worker_errors_are_raised(self):
+        with self.assertRaises(User.DoesNotExist):
+            gather(
+                lambda: None,
+                lambda: User.objects.get(username='missing')
+            )
+
+    def test_worker_queries_are_measured(self):
+        stats = metrics.start_request()
+        try:
+            with metrics.measure_queries(stats):
+                gather(lambda: None, lambda: User.objects.count())
+        finally:
+            metrics.finish_request()
+        self.assertEqual(stats.queries, 1)
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTest(TestCase):
+    """Класс проверяет очередь фоновых задач и команду run_tasks."""
+    def setUp(self):
+        CALLS.clear()
+
+    def run_tasks(self):
+        out = StringIO()
+        call_command('run_tasks', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_enqueued_task_runs_in_worker(self):
+        task = enqueue(remember, 1, 'два')
+        self.assertEqual(task.name, 'core.tests.remember')
+        self.assertEqual(CALLS, [])
+        self.assertIn('Выполнено задач: 1, с ошибкой: 0', self.run_tasks())
+        self.assertEqual(CALLS, [(1, 'два')])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_task_runs_at_once(self):
+        self.assertIsNone(enqueue(remember, 1))
+        self.assertEqual(CALLS, [(1,)])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_MAX_ATTEMPTS=2, TASKS_RETRY_SECONDS=60)
+    def test_failed_task_is_retried_later(self):
+        enqueue(broken)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.assertIn('с ошибкой: 1', self.run_tasks())
+            task = Task.objects.get()
+            self.assertEqual(task.status, Task.PENDING)
+            self.assertEqual(task.attempts, 1)
+            self.assertIn('ValueError', task.error)
+            self.assertIn('с ошибкой: 0', self.run_tasks())
+            Task.objects.update(run_at=task.created)
+            self.run_tasks()
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+
+    def test_abandoned_tasks_are_reclaimed(self):
+        enqueue(remember, 1)
+        Task.objects.update(
+            status=Task.RUNNING, locked_by='gone',
+            started=Task.objects.get().created.replace(year=2000)
+        )
+        self.run_tasks()
+        self.assertEqual(CALLS, [(1,)])
+
+    def test_write_side_effects_wait_for_worker(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        post = Post.objects.create(author=author, text='Фоновая задача')
+        self.assertEqual(Task.objects.count(), 3)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(search_posts('фоновая', Post), [])
+        self.run_tasks()
+        self.assertTrue(
+            FeedEntry.objects.filter(user=reader, post=post).exists()
+        )
+        self.assertEqual(search_posts('фоновая', Post), [post.pk])
+
+
+@override_settings(
+    EMAIL_BACKEND='core.backends.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_BATCH_SIZE=2,
+    TASKS_EAGER=False
+)
+class QueuedMailTest(TestCase):
+    """Класс проверяет очередь писем и отладочный SMTP-сервер."""
+    def setUp(self):
+        self.received = []
+        self.server = DebuggingSMTPServer(
+            ('localhost', 0),
+            lambda *message: self.received.append(message)
+        )
+        threading.Thread(target=self.server.serve_forever).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.smtp = override_settings(
+            EMAIL_HOST='localhost', EMAIL_PORT=self.server.server_address[1]
+        )
+        self.smtp.enable()
+        self.addCleanup(self.smtp.disable)
+
+    def run_tasks(self):
+        call_command('run_tasks', '--once', stdout=StringIO())
+
+    def test_messages_wait_for_worker(self):
+        for number in range(5):
+            mail.send_mail(
+                f'Письмо {number}', 'Текст', 'site@example.com',
+                [f'user{number}@example.com']
+            )
+        self.assertEqual(Mail.objects.count(), 5)
+        self.assertEqual(self.received, [])
+        self.run_tasks()
+        self.assertFalse(Mail.objects.exists())
+        self.assertEqual(
+            sorted(recipients[0] for _, recipients, _ in self.received),
+            [f'user{number}@example.com' for number in range(5)]
+        )
+        self.assertEqual(self.server.connections, 1)
+        message = message_from_bytes(self.received[0][2])
+        self.assertEqual(message['From'], 'site@example.com')
+
+    def test_failed_delivery_is_retried(self):
+        with socket.socket() as closed:
+            closed.bind(('localhost', 0))
+            port = closed.getsockname()[1]
+        mail.send_mail('Тема', 'Текст', 'site@example.com', ['a@example.com'])
+        with override_settings(EMAIL_PORT=port):
+            with self.assertLogs('core.tasks', 'WARNING'):
+                self.run_tasks()
+        self.assertEqual(Mail.objects.get().locked_by, '')
+        self.assertEqual(Task.objects.get().attempts, 1)
+        Task.objects.update(run_at=Task.objects.get().created)
+        self.run_tasks()
+        self.assertEqual(len(self.received), 1)
+
+    def test_eager_delivery_waits_for_commit_and_logs_errors(self):
+        """
+        Без очереди задач письма уходят после фиксации транзакции,
+        а ошибка почтового сервера не доходит до запроса.
+        """
+        with socket.socket() as closed:
+            closed.bind(('localhost', 0))
+            port = closed.getsockname()[1]
+        commits = []
+        on_commit = mock.patch.object(
+            transaction, 'on_commit', side_effect=commits.append
+        )
+        with override_settings(TASKS_EAGER=True, EMAIL_PORT=port), on_commit:
+            mail.send_mail(
+                'Тема', 'Текст', 'site@example.com', ['a@example.com']
+            )
+            self.assertEqual(len(commits), 1)
+            with self.assertLogs('core.backends.mail', 'ERROR'):
+                commits[0]()
+        self.assertEqual(Mail.objects.get().locked_by, '')
+        with override_settings(TASKS_EAGER=True):
+            commits[0]()
+        self.assertFalse(Mail.objects.exists())
+        self.assertEqual(len(self.received), 1)
+
+    def test_message_round_trip(self):
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'site@example.com', ['a@example.com'],
+            cc=['b@example.com'], headers={'X-Test': '1'}
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        restored = load_message(dump_message(message))
+        self.assertEqual(
+            restored.message().as_string().split('\n', 1)[1].count('X-Test'),
+            1
+        )
+        for field in ('subject', 'body', 'to', 'cc', 'alternatives'):
+            self.assertEqual(
+                getattr(restored, field), getattr(message, field)
+            )
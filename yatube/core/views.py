@@ -1,9 +1,17 @@
 """
 Приложение core отвечает за работу страниц,
-при ошибках в запросах к страницам.
+при ошибках в запросах к страницам,
+и за страницу замеров запросов к сайту.
 """
+import hmac
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     """Функция отвечающая за работу страницы с ошибкой 404."""
@@ -23,3 +31,27 @@ def permission_denied(request, exception):
 def csrf_failure(request, reason=''):
     """Функция отвечающая за работу страницы с ошибкой 403."""
     return render(request, 'core/403csrf.html')
+
+
+def can_read_metrics(request):
+    """Замеры видят сотрудники и сборщик с токеном METRICS_TOKEN."""
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+
+def metrics(request):
+    """
+    Функция отвечающая за страницу замеров этого процесса.
+    Текстовый формат Prometheus или JSON при ?format=json.
+    """
+    if not can_read_metrics(request):
+        raise PermissionDenied
+    if request.GET.get('format') == 'json':
+        return JsonResponse(registry.as_dict())
+    return HttpResponse(
+        registry.as_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -2,12 +2,35 @@
 Приложение posts отвечает за работу сайта.
 Реализация работы админки.
 """
+from django.conf import settings
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import get_backend
 
 
-class PostAdmin(admin.ModelAdmin):
+class IndexedSearchAdmin(admin.ModelAdmin):
+    """
+    Поиск по тексту идёт через поисковый индекс, а не LIKE.
+    Если совпадений больше POSTS_SEARCH_MAX_RESULTS, индекс отдал бы
+    не все, поэтому админка ищет обычным образом по search_fields.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        limit = settings.POSTS_SEARCH_MAX_RESULTS
+        found = get_backend().search(
+            search_term.strip(), limit + 1, self.model
+        )
+        if len(found) > limit:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=found), False
+
+
+class PostAdmin(IndexedSearchAdmin):
     list_display = (
         'pk',
         'text',
@@ -21,10 +44,22 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
+class CommentAdmin(IndexedSearchAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'author',
+        'post'
+    )
+    search_fields = ('text',)
+    list_filter = ('created',)
+
+
 admin.site.register(Post, PostAdmin)
 
 admin.site.register(Group)
 
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
 
 admin.site.register(Follow)
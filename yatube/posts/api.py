@@ -0,0 +1,214 @@
+"""
+Приложение posts отвечает за работу сайта.
+В api.py реализован JSON API только для чтения: главная лента,
+лента группы, профиль, лента подписок, пост и его комментарии.
+
+Записи читаются через values() сразу нужными колонками, без создания
+объектов моделей, и превращаются в JSON заранее составленным
+списком полей. Параметры запроса:
+  ?fields=id,text — только перечисленные поля;
+  ?limit=N — размер страницы, не больше API_MAX_PAGE_SIZE;
+  ?after=/?before= — курсоры из полей next/previous ответа.
+Анонимные ответы кешируются так же, как страницы сайта.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+
+from .decorators import anonymous_page_cache
+from .feed import FEED_FIELDS, follow_feed
+from .models import Comment, Group, Post, User
+from .utils import CursorPaginator
+from .views import (
+    group_scopes, index_scopes, post_detail_scopes, profile_scopes
+)
+
+JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+class BadRequest(Exception):
+    """Неверные параметры запроса к API."""
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def image_url(name):
+    return Post._meta.get_field('image').storage.url(name) if name else None
+
+
+# Поле ответа: (колонка для values(), преобразование или None).
+POST_FIELDS = {
+    'id': ('id', None),
+    'text': ('text', None),
+    'pub_date': ('pub_date', isoformat),
+    'author': ('author__username', None),
+    'group': ('group__slug', None),
+    'image': ('image', image_url),
+    'comments_count': ('comments_count', None),
+}
+
+# Поля постов в лентах. Кеш лент не сбрасывается при новых
+# комментариях, поэтому число комментариев отдаёт только сам пост.
+POST_LIST_FIELDS = {
+    name: column for name, column in POST_FIELDS.items()
+    if name != 'comments_count'
+}
+
+COMMENT_FIELDS = {
+    'id': ('id', None),
+    'post': ('post_id', None),
+    'author': ('author__username', None),
+    'text': ('text', None),
+    'created': ('created', isoformat),
+}
+
+
+def error(status, detail):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def requested_fields(request, spec):
+    """Поля из ?fields= или все поля spec."""
+    value = request.GET.get('fields')
+    if not value:
+        return list(spec)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in spec]
+    if unknown or not fields:
+        raise BadRequest(
+            'Неизвестные поля: {}. Доступны: {}.'.format(
+                ', '.join(unknown), ', '.join(spec)
+            )
+        )
+    return fields
+
+
+def page_size(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return settings.NUMBER_OF_RECORDS
+    try:
+        size = int(value)
+    except ValueError:
+        raise BadRequest('limit должен быть целым числом.')
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def serializer(fields, spec):
+    """Функция, превращающая строку values() в словарь ответа."""
+    columns = [(name, *spec[name]) for name in fields]
+
+    def serialize(row):
+        result = {}
+        for name, column, convert in columns:
+            value = row[column]
+            if convert is not None and value is not None:
+                value = convert(value)
+            result[name] = value
+        return result
+    return serialize
+
+
+def json_page(request, queryset, spec, key=('pub_date', 'id'),
+              descending=True):
+    """Страница записей queryset по курсору с полями из ?fields=."""
+    fields = requested_fields(request, spec)
+    columns = {spec[name][0] for name in fields} | set(key)
+    page = CursorPaginator(
+        queryset.values(*columns), page_size(request), key, descending
+    ).get_page_from_request(request)
+    serialize = serializer(fields, spec)
+    return JsonResponse({
+        'results': [serialize(row) for row in page.object_list],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }, json_dumps_params=JSON_PARAMS)
+
+
+def api_view(view):
+    """Только GET и HEAD; неверные параметры — ответ 400."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exception:
+            return error(400, str(exception))
+    return wrapper
+
+
+@api_view
+@anonymous_page_cache(index_scopes)
+def index(request):
+    """Все посты, от новых к старым."""
+    return json_page(request, Post.objects.all(), POST_LIST_FIELDS)
+
+
+@api_view
+@anonymous_page_cache(group_scopes)
+def group(request, slug):
+    """Посты группы."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return error(404, 'Группа не найдена.')
+    return json_page(
+        request, Post.objects.filter(group_id=group_id), POST_LIST_FIELDS
+    )
+
+
+@api_view
+@anonymous_page_cache(profile_scopes)
+def profile(request, username):
+    """Посты автора."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return error(404, 'Автор не найден.')
+    return json_page(
+        request, Post.objects.filter(author_id=author_id),
+        POST_LIST_FIELDS
+    )
+
+
+@api_view
+def follow(request):
+    """Лента подписок; только для авторизированных пользователей."""
+    if not request.user.is_authenticated:
+        return error(401, 'Нужна авторизация.')
+    return json_page(
+        request, follow_feed(request.user), POST_LIST_FIELDS, FEED_FIELDS
+    )
+
+
+@api_view
+@anonymous_page_cache(post_detail_scopes)
+def post_detail(request, post_id):
+    """Один пост."""
+    fields = requested_fields(request, POST_FIELDS)
+    row = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name][0] for name in fields}
+    ).first()
+    if row is None:
+        return error(404, 'Пост не найден.')
+    return JsonResponse(
+        serializer(fields, POST_FIELDS)(row), json_dumps_params=JSON_PARAMS
+    )
+
+
+@api_view
+@anonymous_page_cache(post_detail_scopes)
+def comments(request, post_id):
+    """Комментарии к посту, от старых к новым."""
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Пост не найден.')
+    return json_page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        ('created', 'id'), descending=False
+    )
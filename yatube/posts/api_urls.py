@@ -0,0 +1,22 @@
+"""
+Приложение posts отвечает за работу сайта.
+В api_urls.py прописаны url-адреса JSON API, реализованного в api.py.
+"""
+from django.urls import path
+
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', api.index, name='index'),
+    path('groups/<slug:slug>/posts/', api.group, name='group'),
+    path('profiles/<str:username>/posts/', api.profile, name='profile'),
+    path('follow/posts/', api.follow, name='follow'),
+    path('posts/<int:post_id>/', api.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        api.comments,
+        name='comments'
+    ),
+]
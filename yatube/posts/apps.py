@@ -5,3 +5,6 @@ from django.apps import AppConfig
 class PostsConfig(AppConfig):
     """Регистрация приложения posts."""
     name = 'posts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,248 @@
+"""
+Приложение posts отвечает за работу сайта.
+В benchmark.py собраны сценарии нагрузочного теста страниц сайта.
+
+Каждый сценарий — запрос к одной странице от имени авторизованного
+пользователя (аноним получал бы готовую страницу из кеша).
+Запросы выполняются тестовым клиентом Django в этом же процессе
+или настоящими HTTP-запросами к локальному WSGI-серверу
+с несколькими параллельными клиентами. Для каждого сценария
+считаются перцентили задержки, запросы к базе и пропускная способность.
+"""
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler
+)
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Follow, Group, Post
+
+User = get_user_model()
+
+QUERIES_HEADER = 'X-Benchmark-Queries'
+
+NEAR_CACHE_BACKEND = 'core.backends.cache.TwoTierCache'
+
+
+def isolated_caches():
+    """
+    Настройки CACHES на время замеров: ближние кеши остаются как есть,
+    а вместо общего кеша и кеша лент (Redis или файлы сервера)
+    берётся свой кеш в памяти процесса. Его можно спокойно очищать.
+    """
+    isolated = {}
+    for alias, params in settings.CACHES.items():
+        if params['BACKEND'] == NEAR_CACHE_BACKEND:
+            isolated[alias] = params
+            continue
+        isolated[alias] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'benchmark:{alias}',
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    return isolated
+
+
+def scenarios():
+    """Сценарии: имя, метод, адрес и данные формы."""
+    reader = Follow.objects.values_list(
+        'user__username', flat=True
+    ).first() or User.objects.values_list('username', flat=True).first()
+    group = Group.objects.values_list('slug', flat=True).first()
+    post = Post.objects.order_by('-pk').values_list('pk', flat=True).first()
+    author = Post.objects.filter(pk=post).values_list(
+        'author__username', flat=True
+    ).first()
+    pages = [
+        ('index', 'get', reverse('posts:index'), None),
+        ('profile', 'get',
+         reverse('posts:profile', kwargs={'username': author}), None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', kwargs={'post_id': post}), None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Новая запись нагрузочного теста'}),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', kwargs={'post_id': post}),
+         {'text': 'Новый комментарий нагрузочного теста'}),
+    ]
+    if group:
+        pages.insert(1, ('group_list', 'get', reverse(
+            'posts:group_list', kwargs={'slug': group}), None))
+    return reader, pages
+
+
+def percentile(values, share):
+    """Перцентиль share (0..1) методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def summary(latencies, queries, elapsed):
+    """Итоги сценария: задержки в миллисекундах, запросы к базе, RPS."""
+    return {
+        'requests': len(latencies),
+        'p50': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries': round(sum(queries) / len(queries), 1),
+        'rps': round(len(latencies) / elapsed, 1),
+    }
+
+
+class ClientDriver:
+    """Запросы тестовым клиентом Django в этом процессе, по одному."""
+
+    def __init__(self, username):
+        self.client = Client()
+        self.client.force_login(User.objects.get(username=username))
+
+    def run(self, method, url, data, requests, concurrency):
+        latencies, queries = [], []
+        started = time.perf_counter()
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                begin = time.perf_counter()
+                getattr(self.client, method)(url, data)
+                latencies.append(time.perf_counter() - begin)
+            queries.append(len(captured))
+        return summary(latencies, queries, time.perf_counter() - started)
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def counting_application(application):
+    """
+    WSGI-обёртка: число запросов к базе в заголовке ответа.
+    Настройка нового соединения (PRAGMA) не считается.
+    """
+    def wrapper(environ, start_response):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            if not sql.startswith('PRAGMA'):
+                count += 1
+            return execute(sql, params, many, context)
+
+        def counting_start_response(status, headers, exc_info=None):
+            headers.append((QUERIES_HEADER, str(count)))
+            return start_response(status, headers, exc_info)
+
+        with connection.execute_wrapper(counter):
+            return application(environ, counting_start_response)
+    return wrapper
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Ответ-перенаправление считается результатом запроса."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class WSGIDriver:
+    """
+    HTTP-запросы к локальному многопоточному WSGI-серверу
+    с concurrency параллельными клиентами.
+    """
+
+    def __init__(self, username):
+        client = Client()
+        client.force_login(User.objects.get(username=username))
+        self.cookie = SimpleCookie(client.cookies)[
+            settings.SESSION_COOKIE_NAME
+        ].OutputString(attrs=[])
+        self.server = ThreadedWSGIServer(
+            ('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=True
+        )
+        self.server.set_app(counting_application(get_wsgi_application()))
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        host, port = self.server.server_address
+        self.base = f'http://{host}:{port}'
+
+    def request(self, method, url, data):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        request = urllib.request.Request(
+            self.base + url, data=body, method=method.upper(),
+            headers={'Cookie': self.cookie}
+        )
+        opener = urllib.request.build_opener(NoRedirect)
+        begin = time.perf_counter()
+        try:
+            response = opener.open(request)
+        except urllib.error.HTTPError as error:
+            response = error
+        response.read()
+        return (
+            time.perf_counter() - begin,
+            int(response.headers.get(QUERIES_HEADER, 0))
+        )
+
+    def run(self, method, url, data, requests, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(
+                lambda _: self.request(method, url, data), range(requests)
+            ))
+        latencies = [latency for latency, _ in results]
+        queries = [count for _, count in results]
+        return summary(latencies, queries, time.perf_counter() - started)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Сценарии, которые стали хуже сохранённого базового замера:
+    p95 выросла больше чем на tolerance или запросов к базе стало больше.
+    """
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            found.append(f'{name}: p95 {base["p95"]} → {result["p95"]} мс')
+        if result['queries'] > base['queries']:
+            found.append(
+                f'{name}: запросов {base["queries"]} → {result["queries"]}'
+            )
+    return found
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,72 @@
+"""
+Приложение posts отвечает за работу сайта.
+В cache.py реализованы версии кешируемых фрагментов.
+
+Каждая область (главная страница, группа, профиль автора,
+страница поста, лента подписок пользователя) имеет счётчик поколений.
+Счётчик входит в ключ фрагмента, поэтому фрагменты хранятся
+без срока жизни, а при изменении данных достаточно увеличить счётчик.
+"""
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'posts:version:{}'
+
+
+def index_scope():
+    return 'index'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def feed_scope(user_id):
+    return f'feed:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """Области кеша, в которых отображается пост."""
+    scopes = {
+        index_scope(), profile_scope(post.author_id), post_scope(post.pk)
+    }
+    group_ids = (post.group_id, getattr(post, '_initial_group_id', None))
+    for group_id in group_ids:
+        if group_id is not None:
+            scopes.add(group_scope(group_id))
+    return scopes
+
+
+def _initial_version():
+    # Потерянный счётчик начинается со времени в миллисекундах,
+    # чтобы не совпасть с версиями фрагментов, оставшихся в кеше.
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    """Текущая версия области кеширования."""
+    key = VERSION_KEY.format(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*scopes):
+    """Делает недействительными фрагменты перечисленных областей."""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
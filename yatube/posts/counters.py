@@ -0,0 +1,135 @@
+"""
+Приложение posts отвечает за работу сайта.
+В counters.py ведутся денормализованные счётчики:
+посты автора и группы, комментарии поста,
+подписчики и подписки пользователя.
+"""
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def count_of(model, field, outer='pk'):
+    """Подзапрос с количеством строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef(outer)}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+def user_stats_counts():
+    return {
+        'posts_count': count_of(Post, 'author', 'user_id'),
+        'followers_count': count_of(Follow, 'author', 'user_id'),
+        'following_count': count_of(Follow, 'user', 'user_id'),
+    }
+
+
+def refresh_user_stats(user_id):
+    """Пересчитывает счётчики одного пользователя."""
+    UserStats.objects.get_or_create(user_id=user_id)
+    UserStats.objects.filter(user_id=user_id).update(**user_stats_counts())
+    return UserStats.objects.get(user_id=user_id)
+
+
+def user_stats(user):
+    """Счётчики пользователя; отсутствующая строка создаётся пересчётом."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        user.stats = refresh_user_stats(user.pk)
+        return user.stats
+
+
+def change_user_stats(user_id, create=True, **deltas):
+    """
+    Изменяет счётчики пользователя на deltas.
+    Если строки ещё нет, она создаётся пересчётом,
+    который уже учитывает произошедшее изменение.
+    """
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated and create:
+        refresh_user_stats(user_id)
+
+
+def change_count(model, pk, field, delta):
+    if pk is not None:
+        model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def post_created(post):
+    with transaction.atomic():
+        change_user_stats(post.author_id, posts_count=1)
+        change_count(Group, post.group_id, 'posts_count', 1)
+
+
+def post_moved(post, old_group_id):
+    if post.group_id == old_group_id:
+        return
+    with transaction.atomic():
+        change_count(Group, old_group_id, 'posts_count', -1)
+        change_count(Group, post.group_id, 'posts_count', 1)
+
+
+def post_deleted(post):
+    with transaction.atomic():
+        change_user_stats(post.author_id, create=False, posts_count=-1)
+        change_count(Group, post.group_id, 'posts_count', -1)
+
+
+def comment_changed(comment, delta):
+    change_count(Post, comment.post_id, 'comments_count', delta)
+
+
+def follow_changed(follow, delta):
+    with transaction.atomic():
+        change_user_stats(
+            follow.user_id, create=delta > 0, following_count=delta
+        )
+        change_user_stats(
+            follow.author_id, create=delta > 0, followers_count=delta
+        )
+
+
+def repair_counters():
+    """
+    Пересчитывает все счётчики пакетными UPDATE.
+    Возвращает количество исправленных строк для каждой модели.
+    """
+    repaired = {}
+    with transaction.atomic():
+        UserStats.objects.bulk_create(
+            (
+                UserStats(user_id=user_id)
+                for user_id in User.objects.filter(
+                    stats__isnull=True
+                ).values_list('pk', flat=True).iterator()
+            ),
+            batch_size=500,
+            ignore_conflicts=True
+        )
+        stats_fixed = 0
+        for field, value in user_stats_counts().items():
+            stats_fixed += UserStats.objects.exclude(
+                **{field: value}
+            ).update(**{field: value})
+        repaired['UserStats'] = stats_fixed
+        posts_value = count_of(Comment, 'post')
+        repaired['Post'] = Post.objects.exclude(
+            comments_count=posts_value
+        ).update(comments_count=posts_value)
+        groups_value = count_of(Post, 'group')
+        repaired['Group'] = Group.objects.exclude(
+            posts_count=groups_value
+        ).update(posts_count=groups_value)
+    return repaired
@@ -0,0 +1,79 @@
+"""
+Приложение posts отвечает за работу сайта.
+В decorators.py реализован кеш целых страниц для анонимных посетителей.
+
+Ключ страницы состоит из адреса и версий областей кеша, которые
+на ней отображаются, поэтому изменения данных сразу дают новый ключ.
+Ответ получает ETag из того же ключа; на повторный запрос
+с If-None-Match отдаётся 304 без тела. Last-Modified не отдаётся:
+время самой свежей записи не меняется при правке и удалении записей,
+и по If-Modified-Since браузер получал бы устаревшую страницу.
+Заголовки, которые выставило представление, сохраняются вместе
+со страницей. Авторизованным пользователям страницы рисуются как раньше.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, quote_etag
+)
+
+from .cache import get_version
+
+PAGE_KEY = 'posts:page:v3:{}'
+PAGE_TIMEOUT = 10 * 60
+
+
+def anonymous_page_cache(scopes):
+    """
+    Кеширует страницу для анонимных посетителей.
+    scopes(request, **kwargs) — области кеша страницы или None,
+    если страницу кешировать нельзя (например, её нет).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+            ):
+                return view(request, *args, **kwargs)
+            page_scopes = scopes(request, **kwargs)
+            if page_scopes is None:
+                return view(request, *args, **kwargs)
+            versions = ':'.join(
+                f'{scope}={get_version(scope)}' for scope in page_scopes
+            )
+            digest = hashlib.md5(
+                f'{request.get_full_path()}|{versions}'.encode()
+            ).hexdigest()
+            key = PAGE_KEY.format(digest)
+            etag = quote_etag(digest)
+            state = cache.get(key)
+            if state is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                state = (
+                    response.content,
+                    response['Content-Type'],
+                    [
+                        (header, value) for header, value in response.items()
+                        if header != 'Content-Type'
+                    ]
+                )
+                cache.set(key, state, PAGE_TIMEOUT)
+            content, content_type, headers = state
+            page = HttpResponse(content, content_type=content_type)
+            for header, value in headers:
+                page[header] = value
+            response = get_conditional_response(
+                request, etag=etag, response=page
+            )
+            response['ETag'] = etag
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,140 @@
+"""
+Приложение posts отвечает за работу сайта.
+В events.py реализованы уведомления о новых постах подписок
+(server-sent events).
+
+Читатель ленты подписок открывает поток /follow/events/ и получает
+короткое событие о каждом новом посте авторов, на которых подписан,
+вместо того чтобы перезагружать всю ленту. События раздаёт
+концентратор в памяти процесса: новый пост публикуется в него после
+фиксации транзакции, и его получают потоки, открытые в этом же
+процессе. Пропущенные события (переподключение, другой процесс сайта)
+досылаются по заголовку Last-Event-ID одним запросом к базе.
+Каждый поток занимает поток сервера, поэтому он закрывается через
+SSE_MAX_SECONDS, и браузер сам подключается заново.
+"""
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import Follow, Post
+
+QUEUE_SIZE = 100
+
+
+class Hub:
+    """Подписки потоков на авторов и раздача им событий."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues = {}
+
+    def subscribe(self, author_ids):
+        """Очередь, в которую будут приходить события авторов."""
+        events = queue.Queue(QUEUE_SIZE)
+        with self.lock:
+            for author_id in author_ids:
+                self.queues.setdefault(author_id, set()).add(events)
+        return events
+
+    def unsubscribe(self, events, author_ids):
+        with self.lock:
+            for author_id in author_ids:
+                subscribers = self.queues.get(author_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(events)
+                if not subscribers:
+                    del self.queues[author_id]
+
+    def publish(self, author_id, event):
+        """Отдаёт событие подписчикам автора; переполненные пропускаются."""
+        with self.lock:
+            subscribers = list(self.queues.get(author_id, ()))
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                pass
+
+
+hub = Hub()
+
+
+def post_event(post_id, username, pub_date):
+    return {
+        'id': post_id,
+        'author': username,
+        'pub_date': pub_date.isoformat(),
+        'url': reverse('posts:post_detail', kwargs={'post_id': post_id}),
+    }
+
+
+def publish_post(post):
+    """Сообщает подписчикам автора о новом посте."""
+    hub.publish(
+        post.author_id,
+        post_event(post.pk, post.author.username, post.pub_date)
+    )
+
+
+def missed_events(author_ids, last_id):
+    """События о постах авторов, опубликованных после поста last_id."""
+    rows = Post.objects.filter(
+        author_id__in=author_ids, pk__gt=last_id
+    ).order_by('pk').values_list(
+        'pk', 'author__username', 'pub_date'
+    )[:QUEUE_SIZE]
+    return [post_event(*row) for row in rows]
+
+
+def format_event(event):
+    return 'id: {}\nevent: post\ndata: {}\n\n'.format(
+        event['id'],
+        json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    )
+
+
+class EventStream:
+    """
+    Тело ответа text/event-stream для ленты пользователя.
+    Подписка оформляется сразу, поэтому события, пришедшие до начала
+    отправки, не теряются; close() снимает подписку.
+    """
+
+    def __init__(self, user, last_id=None):
+        self.author_ids = list(
+            Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        )
+        self.events = hub.subscribe(self.author_ids)
+        self.backlog = (
+            missed_events(self.author_ids, last_id)
+            if last_id is not None else []
+        )
+
+    def __iter__(self):
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        for event in self.backlog:
+            yield format_event(event)
+        deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            try:
+                event = self.events.get(
+                    timeout=min(left, settings.SSE_HEARTBEAT_SECONDS)
+                )
+            except queue.Empty:
+                yield ': ping\n\n'
+            else:
+                yield format_event(event)
+
+    def close(self):
+        hub.unsubscribe(self.events, self.author_ids)
@@ -0,0 +1,215 @@
+"""
+Приложение posts отвечает за работу сайта.
+В feed.py собрана лента подписок.
+
+Посты раскладываются по лентам читателей при публикации
+и при подписке (fan-out on write), поэтому страница подписок
+читается одним проходом по индексу FeedEntry. Посты авторов
+с очень большим числом подписчиков не раскладываются,
+а подмешиваются в ленту при чтении (fan-out on read). Когда число
+подписчиков снова опускается до предела, посты автора заново
+раскладываются по лентам всех его подписчиков.
+
+Страницы ленты кешируются для каждого пользователя в отдельном
+кеше POSTS_FEED_CACHE с вытеснением давно не читанных (LRU).
+Ключ страницы состоит из версии ленты пользователя и версий профилей
+подмешиваемых авторов: версия ленты растёт при подписке и отписке
+и при изменении постов авторов, которые раскладываются по лентам.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import F, Q
+
+from core.metrics import record_cache
+
+from .cache import feed_scope, get_version, profile_scope
+from .models import FeedEntry, Follow, Post, UserStats
+from .utils import CursorPaginator
+
+FEED_FIELDS = ('feed_date', 'feed_id')
+
+BATCH_SIZE = 500
+
+
+def is_celebrity(author_id):
+    """Проверяет, что посты автора подмешиваются при чтении."""
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def celebrity_authors(user):
+    """Авторы из подписок пользователя, посты которых не раскладываются."""
+    return list(
+        UserStats.objects.filter(
+            user__following__user=user,
+            followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту пользователя посты автора после подписки."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def fill_feeds(author_id=None):
+    """
+    Раскладывает по лентам все посты всех подписок одним запросом.
+    Нужна после заполнения базы в обход сигналов; уже разложенные
+    записи пропускаются. С author_id раскладываются только посты
+    этого автора.
+    """
+    rows = Follow.objects.exclude(
+        author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).filter(author__posts__isnull=False)
+    if author_id is not None:
+        rows = rows.filter(author_id=author_id)
+    rows = rows.values_list(
+        'user_id', 'author__posts__id', 'author__posts__pub_date'
+    )
+    sql, params = rows.query.sql_with_params()
+    table = FeedEntry._meta.db_table
+    if connection.vendor == 'sqlite':
+        insert, conflict = 'INSERT OR IGNORE', ''
+    else:
+        insert, conflict = 'INSERT', ' ON CONFLICT DO NOTHING'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{insert} INTO {table} (user_id, post_id, pub_date) '
+            f'{sql}{conflict}',
+            params
+        )
+        return cursor.rowcount
+
+
+def left_celebrities(author_id):
+    """
+    Проверяет, что после отписки у автора ровно FEED_FANOUT_LIMIT
+    подписчиков: его посты снова читаются только из FeedEntry, а
+    написанные за время большого числа подписчиков не разложены.
+    """
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def feed_scopes(post):
+    """
+    Области кеша лент подписчиков, в которых виден пост.
+    Ленты с подмешанным автором зависят от версии его профиля.
+    """
+    return author_feed_scopes(post.author_id)
+
+
+def author_feed_scopes(author_id):
+    """Области кеша лент, в которые раскладываются посты автора."""
+    if is_celebrity(author_id):
+        return set()
+    return {
+        feed_scope(user_id)
+        for user_id in Follow.objects.filter(
+            author_id=author_id
+        ).values_list('user_id', flat=True).iterator()
+    }
+
+
+def follow_feed(user, celebrities=None):
+    """
+    Посты ленты подписок пользователя.
+    Ключ сортировки — FEED_FIELDS: без авторов с большим числом
+    подписчиков он совпадает с индексом FeedEntry.
+    """
+    if celebrities is None:
+        celebrities = celebrity_authors(user)
+    if not celebrities:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date'),
+            feed_id=F('feed_entries__post_id')
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=celebrities)
+    ).annotate(feed_date=F('pub_date'), feed_id=F('id'))
+
+
+def request_page_key(request):
+    """
+    Ключ запрошенной страницы ленты: страница берётся из кеша
+    до запросов к базе. Кеш лент ограничен по размеру и сроку жизни.
+    """
+    for param in ('after', 'before', 'page'):
+        value = request.GET.get(param)
+        if value:
+            return f'{param}:{value}'
+    return None
+
+
+def feed_cache_key(user, celebrities, page):
+    versions = [get_version(feed_scope(user.pk))] + [
+        get_version(profile_scope(author_id)) for author_id in celebrities
+    ]
+    return 'posts:feed:{}:{}:{}'.format(
+        user.pk, '.'.join(map(str, versions)), page
+    )
+
+
+def feed_page(request):
+    """
+    Страница ленты подписок пользователя.
+    Повторное чтение той же страницы берётся из кеша без запроса постов.
+    """
+    celebrities = celebrity_authors(request.user)
+    paginator = CursorPaginator(
+        follow_feed(request.user, celebrities).for_feed(),
+        settings.NUMBER_OF_RECORDS,
+        FEED_FIELDS
+    )
+    feed_cache = caches[settings.POSTS_FEED_CACHE]
+    key = feed_cache_key(
+        request.user, celebrities, request_page_key(request)
+    )
+    state = feed_cache.get(key)
+    record_cache(state is not None, state is None)
+    if state is not None:
+        return paginator.restore_page(state)
+    page = paginator.get_page_from_request(request)
+    feed_cache.set(key, paginator.page_state(page))
+    return page
@@ -4,7 +4,9 @@
 для создания поста или комментария.
 """
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import prepare_image, too_large_message
 from .models import Post, Comment
 
 
@@ -17,6 +19,25 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл, обрезанный LimitedUploadHandler, не передаётся в поле:
+        # иначе Pillow попытался бы открыть пустой файл.
+        self.image_too_large = getattr(
+            self.files.get('image'), 'too_large', False
+        )
+        if self.image_too_large:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if self.image_too_large:
+            raise forms.ValidationError(too_large_message())
+        if isinstance(image, UploadedFile):
+            return prepare_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Форма для создания комментария."""
@@ -0,0 +1,222 @@
+"""
+Приложение posts отвечает за работу сайта.
+В images.py реализована проверка и подготовка загружаемых картинок.
+
+Размеры картинки берутся из заголовка без декодирования пикселей.
+Снимки из нескольких кадров (MPO) хранятся как JPEG из первого кадра.
+Метаданные (EXIF, XMP, комментарии, текстовые блоки PNG, блоки
+EXIF и XMP в WebP, комментарии и расширения приложений в GIF)
+вырезаются из байтов файла; картинка перекодируется только тогда, когда EXIF
+требует поворота. Имя файла — хеш его содержимого, поэтому
+одинаковые загрузки хранятся один раз.
+"""
+import hashlib
+import struct
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+EXIF_ORIENTATION = 0x0112
+
+# APP0 (JFIF), APP2 (ICC-профиль) и APP14 (Adobe) влияют на цвета.
+JPEG_KEPT_SEGMENTS = {0xE0, 0xE2, 0xEE}
+JPEG_SOS = 0xDA
+JPEG_EOI = b'\xff\xd9'
+# Сегмент APP2 с таблицей кадров MPO.
+JPEG_MPF = b'MPF\0'
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+
+WEBP_METADATA_CHUNKS = {b'EXIF', b'XMP '}
+# Флаги наличия EXIF и XMP в заголовке VP8X.
+WEBP_METADATA_FLAGS = 0x08 | 0x04
+
+GIF_EXTENSION = 0x21
+GIF_IMAGE = 0x2C
+GIF_TRAILER = 0x3B
+GIF_COMMENT = 0xFE
+GIF_APPLICATION = 0xFF
+# Расширения приложений, задающие повтор анимации.
+GIF_KEPT_APPLICATIONS = {b'NETSCAPE2.0', b'ANIMEXTS1.0'}
+
+
+def strip_jpeg(data):
+    """Удаляет из JPEG сегменты APPn с метаданными и комментарии."""
+    output = [data[:2]]
+    position = 2
+    while position + 4 <= len(data) and data[position] == 0xFF:
+        marker = data[position + 1]
+        if marker == JPEG_SOS:
+            break
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        segment = data[position:position + 2 + length]
+        is_metadata = 0xE0 <= marker <= 0xEF or marker == 0xFE
+        if not is_metadata or marker in JPEG_KEPT_SEGMENTS:
+            output.append(segment)
+        position += 2 + length
+    output.append(data[position:])
+    return b''.join(output)
+
+
+def first_jpeg_frame(data):
+    """
+    Первый кадр MPO: JPEG до первого маркера конца картинки без
+    сегмента MPF, описывающего отброшенные кадры. После SOS байт 0xFF
+    в сжатых данных экранируется, поэтому маркер EOI однозначен.
+    """
+    output = [data[:2]]
+    position = 2
+    while position + 4 <= len(data) and data[position] == 0xFF:
+        marker = data[position + 1]
+        if marker == JPEG_SOS:
+            break
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        segment = data[position:position + 2 + length]
+        if not (marker == 0xE2 and segment[4:8] == JPEG_MPF):
+            output.append(segment)
+        position += 2 + length
+    end = data.find(JPEG_EOI, position)
+    output.append(data[position:] if end == -1 else data[position:end + 2])
+    return b''.join(output)
+
+
+def strip_png(data):
+    """Удаляет из PNG текстовые блоки, EXIF и время изменения."""
+    output = [PNG_SIGNATURE]
+    position = len(PNG_SIGNATURE)
+    while position + 8 <= len(data):
+        length = struct.unpack('>I', data[position:position + 4])[0]
+        chunk_type = data[position + 4:position + 8]
+        chunk_end = position + 12 + length
+        if chunk_type not in PNG_METADATA_CHUNKS:
+            output.append(data[position:chunk_end])
+        position = chunk_end
+    return b''.join(output)
+
+
+def strip_webp(data):
+    """Удаляет из WebP блоки EXIF и XMP и их флаги в VP8X."""
+    output = []
+    position = 12
+    while position + 8 <= len(data):
+        chunk_type = data[position:position + 4]
+        length = struct.unpack('<I', data[position + 4:position + 8])[0]
+        chunk_end = position + 8 + length + length % 2
+        chunk = data[position:chunk_end]
+        if chunk_type == b'VP8X' and length:
+            chunk = (
+                chunk[:8] + bytes([chunk[8] & ~WEBP_METADATA_FLAGS & 0xFF])
+                + chunk[9:]
+            )
+        if chunk_type not in WEBP_METADATA_CHUNKS:
+            output.append(chunk)
+        position = chunk_end
+    body = b'WEBP' + b''.join(output)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def gif_color_table(packed):
+    """Длина таблицы цветов по упакованному байту дескриптора."""
+    return 3 * 2 ** ((packed & 0x07) + 1) if packed & 0x80 else 0
+
+
+def gif_sub_blocks_end(data, position):
+    """Позиция сразу за цепочкой подблоков GIF, начатой в position."""
+    while position < len(data) and data[position]:
+        position += data[position] + 1
+    return position + 1
+
+
+def strip_gif(data):
+    """Удаляет из GIF комментарии и расширения приложений (XMP и др.)."""
+    position = 13 + gif_color_table(data[10])
+    output = [data[:position]]
+    while position < len(data):
+        block = data[position]
+        if block == GIF_EXTENSION and position + 1 < len(data):
+            label = data[position + 1]
+            end = gif_sub_blocks_end(data, position + 2)
+            application = data[position + 3:position + 14]
+            if label != GIF_COMMENT and (
+                label != GIF_APPLICATION
+                or application in GIF_KEPT_APPLICATIONS
+            ):
+                output.append(data[position:end])
+            position = end
+        elif block == GIF_IMAGE and position + 10 <= len(data):
+            start = position
+            position += 10 + gif_color_table(data[position + 9])
+            position = gif_sub_blocks_end(data, position + 1)
+            output.append(data[start:position])
+        else:
+            output.append(data[position:])
+            break
+    return b''.join(output)
+
+
+def strip_metadata(data, image_format):
+    if image_format == 'JPEG':
+        return strip_jpeg(data)
+    if image_format == 'PNG' and data.startswith(PNG_SIGNATURE):
+        return strip_png(data)
+    if image_format == 'WEBP' and data[8:12] == b'WEBP':
+        return strip_webp(data)
+    if image_format == 'GIF' and data[:3] == b'GIF' and len(data) > 13:
+        return strip_gif(data)
+    return data
+
+
+def apply_orientation(data):
+    """Поворачивает JPEG по EXIF перед тем, как EXIF будет удалён."""
+    image = Image.open(BytesIO(data))
+    if image.getexif().get(EXIF_ORIENTATION, 1) == 1:
+        return data
+    buffer = BytesIO()
+    ImageOps.exif_transpose(image).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def too_large_message():
+    return 'Размер файла больше {}.'.format(
+        filesizeformat(settings.POSTS_IMAGE_MAX_BYTES)
+    )
+
+
+def prepare_image(upload):
+    """
+    Проверяет загруженную картинку и возвращает файл без метаданных,
+    названный по хешу содержимого.
+    """
+    if upload.size > settings.POSTS_IMAGE_MAX_BYTES:
+        raise ValidationError(too_large_message())
+    upload.seek(0)
+    header = Image.open(upload)
+    width, height = header.size
+    image_format = header.format
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка больше {settings.POSTS_IMAGE_MAX_PIXELS} пикселей.'
+        )
+    if image_format not in EXTENSIONS and image_format != 'MPO':
+        raise ValidationError('Поддерживаются JPEG, PNG, GIF и WebP.')
+    upload.seek(0)
+    data = upload.read()
+    if image_format == 'MPO':
+        data = first_jpeg_frame(data)
+        image_format = 'JPEG'
+    if image_format == 'JPEG':
+        data = apply_orientation(data)
+    data = strip_metadata(data, image_format)
+    digest = hashlib.sha256(data).hexdigest()
+    return SimpleUploadedFile(
+        f'{digest}.{EXTENSIONS[image_format]}',
+        data,
+        Image.MIME[image_format]
+    )
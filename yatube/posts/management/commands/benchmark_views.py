@@ -0,0 +1,140 @@
+"""
+Приложение posts отвечает за работу сайта.
+Команда нагрузочного теста страниц сайта.
+
+Тест идёт на отдельной временной базе: она создаётся так же,
+как тестовая база Django, заполняется данными заданного объёма
+(тем же генератором, что и команда seed_data) и удаляется
+после замеров. Кеши на время теста заменяются своими, в памяти
+процесса, и очищаются перед замерами: кеш сайта и Redis не трогаются.
+Результаты можно сохранить как базовые и сравнивать с ними
+последующие запуски: при ухудшении команда завершается с ошибкой.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts.benchmark import (
+    ClientDriver, WSGIDriver, isolated_caches, load_baseline, regressions,
+    save_baseline, scenarios
+)
+from posts.seeding import seed
+
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baseline.json'
+)
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест страниц сайта на временной базе.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=300)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Сколько запросов в каждом сценарии.'
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--wsgi', action='store_true',
+            help='Запросы к локальному WSGI-серверу, а не тестовым клиентом.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Параллельные клиенты в режиме --wsgi.'
+        )
+        parser.add_argument(
+            '--query-workers', type=int,
+            default=settings.CONCURRENT_QUERY_WORKERS,
+            help='CONCURRENT_QUERY_WORKERS на время теста; 0 — запросы '
+                 'страницы по очереди.'
+        )
+        parser.add_argument(
+            '--scenario', action='append',
+            help='Запустить только этот сценарий (можно несколько раз).'
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как базовые.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p95 относительно базового замера.'
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                directory, 'benchmark.sqlite3'
+            )
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                with override_settings(
+                    DEBUG=False,
+                    CACHES=isolated_caches(),
+                    CONCURRENT_QUERY_WORKERS=options['query_workers']
+                ):
+                    results = self.benchmark(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.compare(results, options)
+
+    def benchmark(self, options):
+        seed(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows']
+        )
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        reader, pages = scenarios()
+        driver = (WSGIDriver if options['wsgi'] else ClientDriver)(reader)
+        results = {}
+        try:
+            for name, method, url, data in pages:
+                if options['scenario'] and name not in options['scenario']:
+                    continue
+                driver.run(method, url, data, options['warmup'], 1)
+                results[name] = result = driver.run(
+                    method, url, data, options['requests'],
+                    options['concurrency']
+                )
+                self.stdout.write(
+                    f'{name}: p50 {result["p50"]} мс, '
+                    f'p95 {result["p95"]} мс, p99 {result["p99"]} мс, '
+                    f'запросов к базе {result["queries"]}, '
+                    f'{result["rps"]} в секунду'
+                )
+        finally:
+            driver.close()
+        return results
+
+    def compare(self, results, options):
+        path = options['baseline']
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_baseline(path, results)
+            self.stdout.write(f'Базовый замер сохранён в {path}')
+            return
+        if not os.path.exists(path):
+            return
+        found = regressions(
+            results, load_baseline(path), options['tolerance']
+        )
+        if found:
+            raise CommandError(
+                'Страницы стали медленнее базового замера:\n'
+                + '\n'.join(found)
+            )
+        self.stdout.write('Результаты не хуже базового замера.')
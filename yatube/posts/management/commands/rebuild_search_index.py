@@ -0,0 +1,130 @@
+"""
+Приложение posts отвечает за работу сайта.
+Команда перестраивает поисковый индекс постов и комментариев.
+
+Записи читаются порциями по возрастанию первичного ключа, основы слов
+считаются в пуле процессов, а в базу пишет один процесс — каждая порция
+в своей короткой транзакции вместе с отметкой SearchIndexProgress,
+поэтому сайт не блокируется, а прерванная команда продолжает работу
+с последней записанной порции. Новые записи во время перестроения
+попадают в индекс через сигналы.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Comment, Post, SearchIndexProgress
+from posts.search import get_backend, stem_rows, write_fresh
+
+MODELS = {'post': Post, 'comment': Comment}
+
+REPORT_EVERY = 5
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов и комментариев порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=sorted(MODELS),
+            help='Какую модель индексировать (по умолчанию все).'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько записей читать за раз.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Сколько процессов считают основы слов; 1 — без пула.'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Очистить индекс и начать заново, а не продолжить.'
+        )
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS, reverse=True):
+            self.rebuild(
+                MODELS[name],
+                options['chunk_size'],
+                max(options['workers'], 1),
+                options['restart']
+            )
+
+    def rebuild(self, model, chunk_size, workers, restart):
+        label = model._meta.label_lower
+        progress, _ = SearchIndexProgress.objects.get_or_create(model=label)
+        if restart:
+            with transaction.atomic():
+                get_backend().clear(model)
+                progress.last_pk = 0
+                progress.save()
+        elif progress.last_pk:
+            self.stdout.write(
+                f'{label}: продолжение после pk={progress.last_pk}'
+            )
+        started = reported = time.monotonic()
+        done = 0
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        pending = deque()
+        try:
+            for rows in self.chunks(model, progress.last_pk, chunk_size):
+                pending.append(
+                    (rows, pool.submit(stem_rows, rows) if pool else None)
+                )
+                if len(pending) < workers * 2:
+                    continue
+                done += self.write(model, progress, *pending.popleft())
+                if time.monotonic() - reported >= REPORT_EVERY:
+                    reported = time.monotonic()
+                    self.report(label, done, started)
+            while pending:
+                done += self.write(model, progress, *pending.popleft())
+        finally:
+            if pool:
+                # shutdown(cancel_futures=True) появился только в 3.9.
+                for _, future in pending:
+                    future.cancel()
+                pool.shutdown(wait=True)
+        self.report(label, done, started)
+
+    def chunks(self, model, last_pk, chunk_size):
+        """Порции строк (pk, text) с первичным ключом больше last_pk."""
+        while True:
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', 'text')[:chunk_size]
+            )
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1][0]
+
+    def write(self, model, progress, rows, future):
+        """Записывает порцию и отметку о ней в одной транзакции."""
+        stemmed = future.result() if future else stem_rows(rows)
+        with transaction.atomic():
+            write_fresh(model, rows, stemmed)
+            progress.last_pk = rows[-1][0]
+            progress.save()
+        return len(rows)
+
+    def report(self, label, done, started):
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0
+        self.stdout.write(
+            f'{label}: проиндексировано записей — {done} '
+            f'({rate:.0f} в секунду)'
+        )
@@ -0,0 +1,16 @@
+"""
+Приложение posts отвечает за работу сайта.
+Команда пересчитывает денормализованные счётчики
+и исправляет разошедшиеся значения.
+"""
+from django.core.management.base import BaseCommand
+
+from posts.counters import repair_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        for model, repaired in repair_counters().items():
+            self.stdout.write(f'{model}: исправлено строк — {repaired}')
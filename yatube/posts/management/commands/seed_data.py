@@ -0,0 +1,52 @@
+"""
+Приложение posts отвечает за работу сайта.
+Команда быстро заполняет базу правдоподобными данными.
+
+Объёмы задаются параметрами; распределения (популярность авторов,
+групп и свежих постов) описаны в posts/seeding.py. После вставки
+пересчитываются счётчики, раскладываются ленты подписок
+и перестраивается поисковый индекс.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import seed
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу пользователями, постами и комментариями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределить посты.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Сколько строк вставлять в одной транзакции.'
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Начальное значение генератора для повторяемых данных.'
+        )
+        parser.add_argument(
+            '--no-search-index', action='store_true',
+            help='Не перестраивать поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['days'] < 1:
+            raise CommandError('--batch-size и --days должны быть больше 0.')
+        seed(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            search_index=not options['no_search_index'],
+            seed=options['seed'],
+            report=self.stdout.write
+        )
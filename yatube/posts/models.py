@@ -6,6 +6,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentHashStorage
+
 User = get_user_model()
 
 
@@ -14,11 +16,33 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
 
     def __str__(self):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Запросы к постам."""
+    def for_feed(self):
+        """
+        Посты для лент: автор и группа загружаются тем же запросом,
+        выбираются только колонки, которые выводят шаблоны лент.
+        """
+        return self.select_related('author', 'group').only(
+            'text',
+            'pub_date',
+            'image',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+        )
+
+
 class Post(models.Model):
     """Модель для поста."""
     text = models.TextField(
@@ -47,10 +71,32 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentHashStorage(),
         blank=True,
         null=True,
         help_text='Загрузите картинку'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -81,6 +127,14 @@ class Comment(models.Model):
         verbose_name='Дата публикации'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
 
 class Follow(models.Model):
     """Модель для подписки."""
@@ -104,3 +158,79 @@ class Follow(models.Model):
             )
         ]
 
+
+class UserStats(models.Model):
+    """Модель для счётчиков пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписок'
+    )
+
+
+class FeedEntry(models.Model):
+    """
+    Модель для записи ленты подписок.
+    Хранит посты авторов, на которых подписан пользователь,
+    чтобы лента подписок читалась одним проходом по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_entry_user_date_idx'
+            )
+        ]
+
+
+class SearchIndexProgress(models.Model):
+    """
+    Модель для отметки перестроения поискового индекса.
+    Хранит последний проиндексированный первичный ключ модели,
+    чтобы прерванное перестроение продолжилось с того же места.
+    """
+    model = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Модель'
+    )
+    last_pk = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Последний первичный ключ'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Обновлено'
+    )
@@ -0,0 +1,176 @@
+"""
+Приложение posts отвечает за работу сайта.
+В search.py реализован полнотекстовый поиск по постам и комментариям.
+
+Поиск устроен через сменный бэкенд POSTS_SEARCH_BACKEND.
+Основной бэкенд хранит обратный индекс в виртуальных таблицах
+SQLite FTS5 (по одной на модель): в них пишутся основы слов текста,
+поэтому запрос «котами» находит пост про «кота», а время поиска
+не растёт вместе с таблицей постов. Индекс обновляется сигналами:
+сохранённая запись индексируется фоновой задачей (core/tasks.py),
+удалённая убирается сразу; существующие записи индексирует команда
+rebuild_search_index.
+Результаты упорядочены по релевантности (bm25).
+"""
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import stem_text
+
+
+def fts_table(model):
+    """Имя таблицы FTS5 для модели."""
+    return f'{model._meta.db_table}_fts'
+
+
+def match_query(query):
+    """
+    Запрос FTS5 из пользовательской строки.
+    Каждая основа слова берётся в кавычки, поэтому операторы
+    FTS5 в строке поиска не работают и не ломают запрос.
+    """
+    return ' '.join(
+        '"{}"'.format(term.replace('"', '""'))
+        for term in stem_text(query).split()
+    )
+
+
+def stem_rows(rows):
+    """
+    Основы слов для строк (pk, text).
+    Функция верхнего уровня, чтобы её можно было отдать в пул процессов.
+    """
+    return [(pk, stem_text(text)) for pk, text in rows]
+
+
+class BaseSearchBackend:
+    """Интерфейс бэкенда поиска по постам и комментариям."""
+
+    def index(self, obj):
+        """Добавляет запись в индекс или обновляет её."""
+        self.index_rows(type(obj), stem_rows([(obj.pk, obj.text)]))
+
+    def index_rows(self, model, rows):
+        """Записывает в индекс строки (pk, основы слов)."""
+        raise NotImplementedError
+
+    def remove(self, obj):
+        """Убирает запись из индекса."""
+        self.remove_pks(type(obj), [obj.pk])
+
+    def remove_pks(self, model, pks):
+        """Убирает из индекса записи с первичными ключами pks."""
+        raise NotImplementedError
+
+    def clear(self, model):
+        """Очищает индекс модели."""
+        raise NotImplementedError
+
+    def search(self, query, limit, model=Post):
+        """Первичные ключи найденных записей, самые подходящие первыми."""
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """Поиск по таблицам SQLite FTS5 с основами слов."""
+
+    def index_rows(self, model, rows):
+        table = fts_table(model)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {table} WHERE rowid = %s',
+                [(pk,) for pk, body in rows]
+            )
+            cursor.executemany(
+                f'INSERT INTO {table} (rowid, body) VALUES (%s, %s)', rows
+            )
+
+    def remove_pks(self, model, pks):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {fts_table(model)} WHERE rowid = %s',
+                [(pk,) for pk in pks]
+            )
+
+    def clear(self, model):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {fts_table(model)}')
+
+    def search(self, query, limit, model=Post):
+        match = match_query(query)
+        if not match:
+            return []
+        table = fts_table(model)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {table} '
+                f'WHERE {table} MATCH %s ORDER BY rank LIMIT %s',
+                [match, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Запасной бэкенд для баз без FTS5: поиск через LIKE.
+    Индекса не ведёт, найденные записи идут от новых к старым.
+    """
+
+    def index(self, obj):
+        pass
+
+    def index_rows(self, model, rows):
+        pass
+
+    def remove_pks(self, model, pks):
+        pass
+
+    def clear(self, model):
+        pass
+
+    def search(self, query, limit, model=Post):
+        words = query.split()
+        if not words:
+            return []
+        found = model.objects.all()
+        for word in words:
+            found = found.filter(text__icontains=word)
+        return list(
+            found.order_by('-pk').values_list('pk', flat=True)[:limit]
+        )
+
+
+def write_fresh(model, rows, stemmed):
+    """
+    Записывает в индекс порцию, прочитанную как rows (pk, text).
+    Записи, которые изменили или удалили после чтения, пропускаются:
+    их уже обработали сигналы, и старый текст не должен их затереть.
+    """
+    backend = get_backend()
+    read = dict(rows)
+    current = dict(
+        model.objects.filter(
+            pk__range=(rows[0][0], rows[-1][0])
+        ).values_list('pk', 'text')
+    )
+    backend.remove_pks(model, [pk for pk in read if pk not in current])
+    backend.index_rows(model, [
+        (pk, body) for pk, body in stemmed if current.get(pk) == read[pk]
+    ])
+
+
+def get_backend():
+    """Бэкенд поиска из настройки POSTS_SEARCH_BACKEND."""
+    return import_string(settings.POSTS_SEARCH_BACKEND)()
+
+
+def search_posts(query, model=Post):
+    """Ключи записей по запросу, не больше POSTS_SEARCH_MAX_RESULTS."""
+    query = query.strip()
+    if not query:
+        return []
+    return get_backend().search(
+        query, settings.POSTS_SEARCH_MAX_RESULTS, model
+    )
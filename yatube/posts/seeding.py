@@ -0,0 +1,263 @@
+"""
+Приложение posts отвечает за работу сайта.
+В seeding.py реализовано быстрое заполнение базы правдоподобными данными.
+
+Популярность авторов подчиняется степенному закону: немногие авторы
+собирают большую часть подписчиков и пишут больше других.
+Посты распределены по времени и по группам (тоже неравномерно),
+комментарии приходят всплесками вскоре после публикации свежих постов.
+
+Строки вставляются через bulk_create большими порциями, каждая порция —
+в своей транзакции; сигналы при этом не срабатывают, поэтому ленты,
+счётчики и поисковый индекс достраиваются в конце пакетными запросами,
+а кеш сбрасывается увеличением версий затронутых областей.
+"""
+import io
+import random
+import time
+import uuid
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache import (
+    bump_version, feed_scope, group_scope, index_scope, profile_scope
+)
+from .counters import repair_counters
+from .feed import fill_feeds
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+PASSWORD = 'yatube-seed'
+
+WORDS = (
+    'кот', 'котики', 'город', 'утро', 'вечером', 'новости', 'погода',
+    'дорога', 'книга', 'читаю', 'пишу', 'думаю', 'сегодня', 'завтра',
+    'друзья', 'работа', 'отпуск', 'море', 'горы', 'фотографии', 'кофе',
+    'музыка', 'концерт', 'фильм', 'смотрели', 'весна', 'осень', 'снег',
+    'красивый', 'новый', 'старый', 'интересно', 'очень', 'немного',
+    'программирование', 'проект', 'рецепт', 'пирог', 'сад', 'прогулка',
+)
+
+GROUP_SHARE = 0.7
+AUTHOR_FOLLOW_ALPHA = 1.2
+AUTHOR_POST_ALPHA = 0.8
+GROUP_ALPHA = 1.1
+HOT_POST_ALPHA = 1.3
+BURST_MEAN = 4
+COMMENT_DELAY = 60 * 60
+
+
+def zipf_index(rng, size, alpha):
+    """
+    Индекс от 0 до size - 1 с вероятностью примерно 1 / (i + 1) ** alpha.
+    Обратное преобразование непрерывного приближения, без таблиц весов.
+    """
+    exponent = 1 - alpha
+    rank = ((size ** exponent - 1) * rng.random() + 1) ** (1 / exponent)
+    return min(int(rank), size) - 1
+
+
+def text(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+@contextmanager
+def explicit_dates():
+    """Отключает auto_now_add, чтобы даты можно было задать самим."""
+    fields = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    )
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Seeder:
+    """Генератор данных; report(сообщение) получает отчёт о скорости."""
+
+    def __init__(self, batch_size=5000, seed=None, report=None):
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.report = report or (lambda message: None)
+        self.now = timezone.now()
+        # Имена и адреса групп уникальны и при запусках в одну секунду.
+        self.prefix = f'seed{uuid.uuid4().hex[:12]}'
+        self.user_pks = self.group_pks = ()
+
+    def insert(self, model, objects, **kwargs):
+        """
+        Вставляет объекты порциями по batch_size, каждую в своей
+        транзакции. Возвращает первичные ключи новых строк.
+        """
+        last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        started = time.monotonic()
+        objects = iter(objects)
+        while True:
+            chunk = list(islice(objects, self.batch_size))
+            if not chunk:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, **kwargs)
+        pks = array('q', model.objects.filter(
+            pk__gt=last_pk
+        ).order_by('pk').values_list('pk', flat=True).iterator())
+        elapsed = time.monotonic() - started
+        self.report(
+            f'{model._meta.label_lower}: {len(pks)} строк '
+            f'({len(pks) / elapsed if elapsed else 0:.0f} в секунду)'
+        )
+        return pks
+
+    def users(self, count):
+        password = make_password(PASSWORD)
+        self.user_pks = self.insert(User, (
+            User(username=f'{self.prefix}_{number}', password=password,
+                 first_name=text(self.rng, 1, 1), last_name=f'№{number}')
+            for number in range(count)
+        ))
+        return self.user_pks
+
+    def groups(self, count):
+        self.group_pks = self.insert(Group, (
+            Group(title=text(self.rng, 1, 3), slug=f'{self.prefix}-{number}',
+                  description=text(self.rng, 5, 15))
+            for number in range(count)
+        ))
+        return self.group_pks
+
+    def follows(self, count, users):
+        """Читатели равновероятны, авторы — по степенному закону."""
+        def pairs():
+            for _ in range(count):
+                user = self.rng.choice(users)
+                author = users[
+                    zipf_index(self.rng, len(users), AUTHOR_FOLLOW_ALPHA)
+                ]
+                if user != author:
+                    yield Follow(user_id=user, author_id=author)
+        return self.insert(Follow, pairs(), ignore_conflicts=True)
+
+    def posts(self, count, users, groups, days):
+        """Посты по возрастанию даты за последние days дней."""
+        start = self.now - timedelta(days=days)
+        step = timedelta(days=days) / max(count, 1)
+
+        def rows():
+            for number in range(count):
+                group = None
+                if groups and self.rng.random() < GROUP_SHARE:
+                    group = groups[
+                        zipf_index(self.rng, len(groups), GROUP_ALPHA)
+                    ]
+                yield Post(
+                    text=text(self.rng, 8, 40),
+                    author_id=users[
+                        zipf_index(self.rng, len(users), AUTHOR_POST_ALPHA)
+                    ],
+                    group_id=group,
+                    pub_date=start + step * (number + self.rng.random())
+                )
+        with explicit_dates():
+            return self.insert(Post, rows())
+
+    def comments(self, count, users, posts):
+        """
+        Комментарии всплесками: пост выбирается среди самых свежих
+        по степенному закону, комментарии идут вскоре после него.
+        """
+        dates = array('d', (
+            pub_date.timestamp() for pub_date in Post.objects.filter(
+                pk__range=(posts[0], posts[-1])
+            ).order_by('pk').values_list('pub_date', flat=True).iterator()
+        ))
+        now = self.now.timestamp()
+
+        def rows():
+            made = 0
+            while made < count:
+                index = len(posts) - 1 - zipf_index(
+                    self.rng, len(posts), HOT_POST_ALPHA
+                )
+                burst = min(
+                    1 + int(self.rng.expovariate(1 / BURST_MEAN)),
+                    count - made
+                )
+                for _ in range(burst):
+                    created = min(
+                        dates[index] + self.rng.expovariate(
+                            1 / COMMENT_DELAY
+                        ),
+                        now
+                    )
+                    yield Comment(
+                        post_id=posts[index],
+                        author_id=self.rng.choice(users),
+                        text=text(self.rng, 2, 15),
+                        created=datetime.fromtimestamp(
+                            created, tz=self.now.tzinfo
+                        )
+                    )
+                made += burst
+        with explicit_dates():
+            return self.insert(Comment, rows())
+
+    def derived(self, search_index=True):
+        """
+        Счётчики, ленты и поисковый индекс для вставленных строк.
+        Индекс дописывается с последней проиндексированной записи.
+        """
+        started = time.monotonic()
+        repair_counters()
+        self.report(
+            f'Ленты: {fill_feeds()} записей, счётчики пересчитаны '
+            f'за {time.monotonic() - started:.1f} с'
+        )
+        if search_index:
+            output = io.StringIO()
+            call_command('rebuild_search_index', stdout=output)
+            for line in output.getvalue().splitlines():
+                self.report(line)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Сбрасывает кеш страниц, на которых видны вставленные строки:
+        главной, новых групп, профилей и лент новых пользователей.
+        Подписки, посты и комментарии связывают только новых
+        пользователей, а страницы новых постов ещё не кешировались.
+        """
+        bump_version(
+            index_scope(),
+            *(group_scope(pk) for pk in self.group_pks),
+            *(profile_scope(pk) for pk in self.user_pks),
+            *(feed_scope(pk) for pk in self.user_pks)
+        )
+
+
+def seed(users, groups, posts, comments, follows, days=365,
+         batch_size=5000, search_index=True, seed=None, report=None):
+    """Заполняет базу заданным числом строк каждого вида."""
+    seeder = Seeder(batch_size, seed, report)
+    user_pks = seeder.users(users)
+    group_pks = seeder.groups(groups)
+    if user_pks:
+        seeder.follows(follows, user_pks)
+        post_pks = seeder.posts(posts, user_pks, group_pks, days)
+        if post_pks:
+            seeder.comments(comments, user_pks, post_pks)
+    seeder.derived(search_index)
@@ -0,0 +1,199 @@
+"""
+Приложение posts отвечает за работу сайта.
+В signals.py описаны обработчики изменений моделей.
+
+Побочные действия, которые не нужны для ответа на сам запрос
+(поисковый индекс, раскладка постов по лентам и сброс кеша лент
+подписчиков), ставятся в очередь фоновых задач. Счётчики и версии
+кеша страниц самого поста, группы и профиля меняются сразу: от них
+зависит страница, которую автор увидит после перенаправления.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from core.tasks import enqueue
+
+from . import counters, events, feed, tasks
+from .cache import (
+    bump_version, feed_scope, group_scope, index_scope, post_scope,
+    post_scopes, profile_scope
+)
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend
+
+
+def index_later(instance):
+    """Ставит обновление записи в поисковом индексе в очередь."""
+    enqueue(tasks.index_object, instance._meta.label, instance.pk)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    """Запоминает исходную группу поста."""
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """
+    Обновляет счётчики и сбрасывает кеш страниц с постом.
+    Ставит в очередь обновление поста в поисковом индексе и сброс
+    кеша лент подписчиков (у нового поста — вместе с раскладкой
+    по этим лентам). О новом посте после фиксации транзакции
+    сообщает открытым потокам событий, если они включены.
+    """
+    if created:
+        counters.post_created(instance)
+    else:
+        counters.post_moved(instance, instance._initial_group_id)
+    bump_version(*post_scopes(instance))
+    instance._initial_group_id = instance.group_id
+    index_later(instance)
+    if created:
+        enqueue(tasks.fan_out, instance.pk)
+        if settings.SSE_ENABLED:
+            transaction.on_commit(lambda: events.publish_post(instance))
+    else:
+        enqueue(tasks.refresh_feeds, instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    """
+    Обновляет счётчики и сбрасывает кеш страниц, на которых был пост.
+    Убирает пост из поискового индекса.
+    """
+    counters.post_deleted(instance)
+    bump_version(*post_scopes(instance), *feed.feed_scopes(instance))
+    get_backend().remove(instance)
+
+
+def group_author_scopes(group_id):
+    """Области кеша профилей авторов, пишущих в группу."""
+    return {
+        profile_scope(author_id)
+        for author_id in Post.objects.filter(
+            group_id=group_id
+        ).values_list('author_id', flat=True).distinct()
+    }
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    """
+    Запоминает авторов постов группы: после удаления посты уже
+    отвязаны от неё без сигналов Post.
+    """
+    instance._author_scopes = group_author_scopes(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш страниц со ссылками на группу: главной, группы,
+    профилей её авторов и страниц их постов.
+    """
+    author_scopes = getattr(instance, '_author_scopes', None)
+    if author_scopes is None:
+        author_scopes = group_author_scopes(instance.pk)
+    bump_version(index_scope(), group_scope(instance.pk), *author_scopes)
+
+
+def loaded_name(user):
+    """Имя и фамилия пользователя без загрузки отложенных полей."""
+    return user.__dict__.get('first_name'), user.__dict__.get('last_name')
+
+
+@receiver(post_init, sender=User)
+def user_loaded(sender, instance, **kwargs):
+    """Запоминает исходное имя пользователя."""
+    instance._initial_name = loaded_name(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """
+    Если изменилось имя, сбрасывает кеш страниц, где оно показано:
+    профиля, постов автора, главной, групп с его постами и лент
+    его подписчиков.
+    """
+    name = loaded_name(instance)
+    if created or name == instance._initial_name:
+        return
+    instance._initial_name = name
+    posts = Post.objects.filter(author=instance)
+    bump_version(
+        index_scope(),
+        profile_scope(instance.pk),
+        *(post_scope(pk) for pk in posts.values_list('pk', flat=True)),
+        *(
+            group_scope(group_id)
+            for group_id in posts.filter(
+                group__isnull=False
+            ).values_list('group_id', flat=True).distinct()
+        ),
+        *feed.author_feed_scopes(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    """
+    Увеличивает счётчик комментариев поста и сбрасывает кеш его страницы.
+    Ставит в очередь обновление комментария в поисковом индексе.
+    """
+    if created:
+        counters.comment_changed(instance, 1)
+    bump_version(post_scope(instance.post_id))
+    index_later(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """
+    Уменьшает счётчик комментариев поста и сбрасывает кеш его страницы.
+    Убирает комментарий из поискового индекса.
+    """
+    counters.comment_changed(instance, -1)
+    bump_version(post_scope(instance.post_id))
+    get_backend().remove(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    """
+    Обновляет счётчики подписок и сбрасывает кеш профилей с ними.
+    Ставит в очередь добавление постов автора в ленту подписчика.
+    """
+    if created:
+        counters.follow_changed(instance, 1)
+        enqueue(tasks.follow_author, instance.user_id, instance.author_id)
+        bump_version(
+            feed_scope(instance.user_id),
+            profile_scope(instance.user_id),
+            profile_scope(instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """
+    Обновляет счётчики подписок и сбрасывает кеш профилей с ними.
+    Убирает посты автора из ленты отписавшегося пользователя.
+    Если посты автора перестали подмешиваться при чтении, ставит
+    в очередь их раскладку по лентам оставшихся подписчиков.
+    """
+    counters.follow_changed(instance, -1)
+    feed.remove_author(instance.user_id, instance.author_id)
+    if feed.left_celebrities(instance.author_id):
+        enqueue(tasks.rebuild_feeds, instance.author_id)
+    bump_version(
+        feed_scope(instance.user_id),
+        profile_scope(instance.user_id),
+        profile_scope(instance.author_id)
+    )
@@ -0,0 +1,117 @@
+"""
+Приложение posts отвечает за работу сайта.
+В stemmer.py реализован стеммер Портера (Snowball) для русского языка:
+поиск находит «котами» по запросу «кот».
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+DERIVATIONAL = ((), ('ост', 'ость'))
+
+WORD = re.compile(r'\w+')
+
+
+def _remove(word, start, endings):
+    """
+    Удаляет самое длинное окончание из endings, лежащее в word[start:].
+    Окончания первой группы должны идти после «а» или «я».
+    Возвращает None, если окончание не найдено.
+    """
+    after_vowel, plain = endings
+    region = word[start:]
+    found = max(
+        (ending for ending in after_vowel + plain
+         if region.endswith(ending)),
+        key=len,
+        default=None
+    )
+    if found is None:
+        return None
+    if found in after_vowel and found not in plain:
+        if not region[:-len(found)].endswith(('а', 'я')):
+            return None
+    return word[:-len(found)]
+
+
+def _region_after_vowel_pair(word, start):
+    """Позиция после первой согласной, идущей за гласной (R1 Snowball)."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа русского слова."""
+    word = word.lower().replace('ё', 'е')
+    rv = next(
+        (position + 1 for position, letter in enumerate(word)
+         if letter in VOWELS),
+        len(word)
+    )
+    r2 = _region_after_vowel_pair(word, _region_after_vowel_pair(word, 0))
+
+    result = _remove(word, rv, PERFECTIVE_GERUND)
+    if result is None:
+        word = _remove(word, rv, REFLEXIVE) or word
+        adjective = _remove(word, rv, ADJECTIVE)
+        if adjective is not None:
+            word = _remove(adjective, rv, PARTICIPLE) or adjective
+        else:
+            word = (
+                _remove(word, rv, VERB)
+                or _remove(word, rv, NOUN)
+                or word
+            )
+    else:
+        word = result
+
+    if word[rv:].endswith('и'):
+        word = word[:-1]
+    if len(word) > r2:
+        word = _remove(word, r2, DERIVATIONAL) or word
+
+    if word[rv:].endswith('нн'):
+        word = word[:-1]
+    else:
+        superlative = _remove(word, rv, SUPERLATIVE)
+        if superlative is not None:
+            word = superlative
+            if word[rv:].endswith('нн'):
+                word = word[:-1]
+        elif word[rv:].endswith('ь'):
+            word = word[:-1]
+    return word
+
+
+def stem_text(text):
+    """Текст из основ слов, разделённых пробелами."""
+    return ' '.join(stem(word) for word in WORD.findall(text))
@@ -0,0 +1,33 @@
+"""
+Приложение posts отвечает за работу сайта.
+В storage.py описано хранилище файлов, названных по хешу содержимого.
+"""
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Хранилище для файлов, имя которых — SHA-256 содержимого.
+    Файл с таким именем уже содержит те же данные,
+    поэтому повторная загрузка не записывается.
+    Остальные файлы сохраняются как в FileSystemStorage.
+    """
+    @staticmethod
+    def is_hashed(name):
+        stem = os.path.splitext(os.path.basename(name))[0]
+        return bool(HASH_NAME.match(stem))
+
+    def get_available_name(self, name, max_length=None):
+        if self.is_hashed(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+    def _save(self, name, content):
+        if self.is_hashed(name) and self.exists(name):
+            return name
+        return super()._save(name, content)
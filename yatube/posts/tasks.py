@@ -0,0 +1,57 @@
+"""
+Приложение posts отвечает за работу сайта.
+В tasks.py собраны фоновые задачи, которые сигналы ставят
+в очередь (core/tasks.py) вместо выполнения внутри запроса.
+
+Задача получает только первичные ключи и сама перечитывает записи:
+к её запуску запись могла измениться или исчезнуть. Повторный запуск
+задачи ничего не портит.
+"""
+from django.apps import apps
+
+from .cache import bump_version, feed_scope
+from .feed import add_author, author_feed_scopes, fan_out_post, fill_feeds
+from .models import Follow, Post
+from .search import get_backend
+
+
+def index_object(label, pk):
+    """Обновляет запись в поисковом индексе или убирает удалённую."""
+    model = apps.get_model(label)
+    obj = model.objects.filter(pk=pk).only('text').first()
+    if obj is None:
+        get_backend().remove_pks(model, [pk])
+    else:
+        get_backend().index(obj)
+
+
+def fan_out(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date'
+    ).first()
+    if post is None:
+        return
+    fan_out_post(post)
+    refresh_feeds(post.author_id)
+
+
+def refresh_feeds(author_id):
+    """Сбрасывает кеш лент подписчиков автора."""
+    bump_version(*author_feed_scopes(author_id))
+
+
+def rebuild_feeds(author_id):
+    """
+    Раскладывает все посты автора по лентам всех его подписчиков
+    и сбрасывает кеш этих лент.
+    """
+    fill_feeds(author_id)
+    refresh_feeds(author_id)
+
+
+def follow_author(user_id, author_id):
+    """Добавляет посты автора в ленту подписчика, если подписка цела."""
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        add_author(user_id, author_id)
+        bump_version(feed_scope(user_id))
@@ -0,0 +1,24 @@
+from django import template
+
+from posts.thumbnails import (
+    thumbnail_failed, thumbnail_sizes, thumbnail_sources
+)
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_image(post):
+    """
+    Миниатюры картинки поста или заглушка, пока они строятся.
+    Если миниатюры не построились, выводится исходная картинка.
+    """
+    width, height = thumbnail_sizes()[0]
+    thumbnail = thumbnail_sources(post)
+    return {
+        'post': post,
+        'thumbnail': thumbnail,
+        'failed': thumbnail is None and thumbnail_failed(post),
+        'width': width,
+        'height': height,
+    }
@@ -0,0 +1,153 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет JSON API для чтения лент.
+"""
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None
+            )
+            for number in range(15)
+        ]
+        cls.post = cls.posts[-1]
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text=f'Комментарий {number}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_index_pages_by_cursor(self):
+        first = self.client.get(reverse('api:index')).json()
+        self.assertEqual(len(first['results']), settings.NUMBER_OF_RECORDS)
+        self.assertEqual(first['results'][0]['id'], self.post.pk)
+        self.assertEqual(first['results'][0]['author'], 'author')
+        self.assertIsNone(first['previous'])
+        second = self.client.get(
+            reverse('api:index'), {'after': first['next']}
+        ).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        self.assertEqual(
+            {row['id'] for row in first['results'] + second['results']},
+            {post.pk for post in self.posts}
+        )
+
+    def test_sparse_fields_and_limit(self):
+        data = self.client.get(
+            reverse('api:index'), {'fields': 'id,text', 'limit': 3}
+        ).json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(
+            data['results'][0], {'id': self.post.pk, 'text': self.post.text}
+        )
+
+    def test_listing_changes_with_comments(self):
+        """Ленты не отдают число комментариев, а пост — свежее."""
+        url = reverse('api:index')
+        first = self.client.get(url)
+        self.assertNotIn('comments_count', first.json()['results'][0])
+        response = self.client.get(url, {'fields': 'comments_count'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        detail_url = reverse(
+            'api:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        self.assertEqual(
+            self.client.get(detail_url).json()['comments_count'], 3
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Новый комментарий'
+        )
+        self.assertEqual(self.client.get(url).json(), first.json())
+        self.assertEqual(
+            self.client.get(detail_url).json()['comments_count'], 4
+        )
+
+    def test_bad_parameters(self):
+        for params in ({'fields': 'id,password'}, {'limit': 'много'}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('api:index'), params)
+                self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+                self.assertIn('detail', response.json())
+
+    def test_group_and_profile(self):
+        group = self.client.get(
+            reverse('api:group', kwargs={'slug': 'group'}), {'limit': 100}
+        ).json()
+        self.assertEqual(len(group['results']), 7)
+        self.assertTrue(
+            all(row['group'] == 'group' for row in group['results'])
+        )
+        profile = self.client.get(
+            reverse('api:profile', kwargs={'username': 'author'}),
+            {'limit': 100}
+        ).json()
+        self.assertEqual(len(profile['results']), 15)
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('api:group', kwargs={'slug': 'missing'}),
+            reverse('api:profile', kwargs={'username': 'missing'}),
+            reverse('api:post_detail', kwargs={'post_id': 10 ** 6}),
+            reverse('api:comments', kwargs={'post_id': 10 ** 6}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_post_detail_and_comments(self):
+        post = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(post['text'], self.post.text)
+        self.assertEqual(post['comments_count'], 3)
+        self.assertIsNone(post['image'])
+        comments = self.client.get(
+            reverse('api:comments', kwargs={'post_id': self.post.pk})
+        ).json()
+        self.assertEqual(
+            [row['text'] for row in comments['results']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2']
+        )
+
+    def test_follow_feed(self):
+        response = self.client.get(reverse('api:follow'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.client.force_login(self.reader)
+        data = self.client.get(reverse('api:follow'), {'limit': 100}).json()
+        self.assertEqual(len(data['results']), 15)
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:index'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        """Страница выбирается одним запросом при любом размере."""
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:index'), {'limit': 2})
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get(reverse('api:index'), {'limit': 15})
@@ -0,0 +1,62 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет подсчёты нагрузочного теста.
+"""
+from django.test import TestCase, override_settings
+
+from posts.benchmark import (
+    ClientDriver, isolated_caches, percentile, regressions, scenarios
+)
+from posts.seeding import seed
+
+
+class BenchmarkTest(TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+    def test_regressions(self):
+        baseline = {'index': {'p95': 10.0, 'queries': 3.0}}
+        self.assertEqual(
+            regressions(
+                {'index': {'p95': 11.0, 'queries': 3.0}}, baseline, 0.2
+            ),
+            []
+        )
+        self.assertEqual(
+            len(regressions(
+                {'index': {'p95': 13.0, 'queries': 4.0}}, baseline, 0.2
+            )),
+            2
+        )
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'core.backends.cache.TwoTierCache',
+            'LOCATION': 'shared',
+        },
+        'shared': {
+            'BACKEND': 'core.backends.cache.RedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+        },
+    })
+    def test_isolated_caches_leave_configured_caches_alone(self):
+        """Замеры не очищают настроенный общий кеш (Redis)."""
+        isolated = isolated_caches()
+        self.assertEqual(isolated['default']['LOCATION'], 'shared')
+        self.assertEqual(
+            isolated['shared']['BACKEND'],
+            'django.core.cache.backends.locmem.LocMemCache'
+        )
+
+    def test_scenarios_run_with_test_client(self):
+        seed(users=3, groups=1, posts=5, comments=5, follows=2)
+        reader, pages = scenarios()
+        driver = ClientDriver(reader)
+        for name, method, url, data in pages:
+            with self.subTest(name=name):
+                result = driver.run(method, url, data, 2, 1)
+                self.assertEqual(result['requests'], 2)
+                self.assertGreater(result['queries'], 0)
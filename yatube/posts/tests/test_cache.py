@@ -2,15 +2,16 @@
 Тесты, написанные с помощью модуля unittest.
 Проверяет корректную работу функцию кеширования.
 """
+import time
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.core.cache.utils import make_template_fragment_key
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils.http import http_date
 
-from posts.models import Post, Group
-
-from yatube.settings import NUMBER_OF_RECORDS
+from posts.models import Comment, Follow, Post, Group
 
 User = get_user_model()
 
@@ -32,21 +33,221 @@ class CacheIndexTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
     def test_cache(self):
-        [page_number] = Post.objects.count() % NUMBER_OF_RECORDS
+        """Фрагмент главной страницы живёт, пока не изменились посты."""
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertTrue(response.content)
-        len_resp = len(response.content)
-        self.post.delete()
+        self.assertContains(response, self.post.text)
+        Post.objects.filter(pk=self.post.pk).update(text='Обход сигналов')
         response = self.authorized_client.get(reverse('posts:index'))
-        self.assertTrue(response.content)
-        len_resp_2 = len(response.content)
-        self.assertEqual(len_resp, len_resp_2)
-        key = make_template_fragment_key('index_page', [page_number])
-        cache.delete(key)
+        self.assertContains(response, self.post.text)
+        Post.objects.get(pk=self.post.pk).delete()
         response = self.authorized_client.get(reverse('posts:index'))
-        len_resp_3 = len(response.content)
-        self.assertNotEqual(len_resp, len_resp_3)
+        self.assertNotContains(response, self.post.text)
+        self.assertNotContains(response, 'Обход сигналов')
+
+    def test_new_post_is_visible_at_once(self):
+        """Новый пост сразу виден на главной, в группе и в профиле."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        Post.objects.create(
+            author=self.user,
+            text='Свежий пост',
+            group=self.group,
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+
+    def test_moved_post_leaves_old_group_page(self):
+        """Пост, перенесённый в другую группу, пропадает из старой."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        self.assertContains(self.authorized_client.get(url), self.post.text)
+        self.post.group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Тестовое описание',
+        )
+        self.post.save()
+        self.assertNotContains(self.authorized_client.get(url), self.post.text)
+
+    def test_group_changes_reach_profile_and_post_pages(self):
+        """Смена адреса и удаление группы видны в профиле и у поста."""
+        group = Group.objects.create(
+            title='Старая группа', slug='old', description='Описание'
+        )
+        post = Post.objects.create(
+            author=self.user, text='Пост в группе', group=group
+        )
+        urls = (
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        )
+        guest = Client()
+        for url in urls:
+            self.assertContains(guest.get(url), '/group/old/')
+        group.slug = 'new'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = guest.get(url)
+                self.assertNotContains(response, '/group/old/')
+                self.assertContains(response, '/group/new/')
+        group.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(guest.get(url), '/group/new/')
+
+    def test_author_name_change_reaches_cached_pages(self):
+        """Новое имя автора сразу видно на страницах с его постами."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name, user.last_name = 'Лев', 'Толстой'
+        user.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.authorized_client.get(url), 'Лев Толстой'
+                )
+
+    def test_junk_page_parameters_share_first_page_fragment(self):
+        """Неверные параметры страницы не заводят новых фрагментов."""
+        for params in ({}, {'page': 'мусор'}, {'after': 'мусор'}):
+            with self.subTest(params=params):
+                response = self.authorized_client.get(
+                    reverse('posts:index'), params
+                )
+                self.assertIsNone(response.context['page_number'])
+
+
+class CacheFollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Kumir')
+        cls.other = User.objects.create_user(username='Drugoy')
+        cls.reader = User.objects.create_user(username='Poklonik')
+        cls.post = Post.objects.create(author=cls.author, text='Старая запись')
+        Post.objects.create(author=cls.other, text='Чужая запись')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.POSTS_FEED_CACHE].clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed_texts(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_feed_page_is_cached_per_user(self):
+        """Лента берётся из кеша своего пользователя."""
+        self.assertEqual(self.feed_texts(), ['Старая запись'])
+        Post.objects.filter(pk=self.post.pk).update(text='Обход сигналов')
+        self.assertEqual(self.feed_texts(), ['Старая запись'])
+        other_client = Client()
+        other_client.force_login(self.author)
+        response = other_client.get(reverse('posts:follow_index'))
+        self.assertFalse(response.context['page_obj'])
+
+    def test_feed_follows_changes(self):
+        """Кеш ленты сбрасывается при новых постах и подписках."""
+        self.feed_texts()
+        Post.objects.create(author=self.author, text='Новая запись')
+        self.assertEqual(self.feed_texts(), ['Новая запись', 'Старая запись'])
+        Follow.objects.create(user=self.reader, author=self.other)
+        self.assertIn('Чужая запись', self.feed_texts())
+        Follow.objects.filter(author=self.author).delete()
+        self.assertEqual(self.feed_texts(), ['Чужая запись'])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_post_resets_feed(self):
+        """Пост подмешиваемого автора сбрасывает кеш ленты."""
+        self.feed_texts()
+        Post.objects.create(author=self.author, text='Новая запись')
+        self.assertEqual(self.feed_texts(), ['Новая запись', 'Старая запись'])
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_anonymous_page_is_served_from_cache(self):
+        """Повторный запрос анонима отдаётся без отрисовки шаблона."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url)
+        self.assertTemplateUsed(first, 'posts/post_detail.html')
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertFalse(second.templates)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('no-cache', second['Cache-Control'])
+
+    def test_conditional_get(self):
+        """Браузер с актуальной копией получает 304."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304
+        )
+        self.assertNotIn('Last-Modified', response)
+
+    def test_edit_is_not_hidden_by_if_modified_since(self):
+        """Правка поста не прячется за 304 по If-Modified-Since."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Исправленный текст')
+
+    def test_new_comment_changes_post_page(self):
+        """Новый комментарий даёт новую версию страницы поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Свежий комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_authorized_pages_are_not_cached(self):
+        """Авторизованным страницы рисуются на каждый запрос."""
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertTemplateUsed(response, 'posts/index.html')
+        self.assertFalse(response.has_header('ETag'))
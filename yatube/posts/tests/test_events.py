@@ -0,0 +1,108 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет поток уведомлений о новых постах подписок.
+"""
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.events import hub, publish_post
+from posts.models import Follow, Post, User
+
+FAST_STREAM = {
+    'SSE_ENABLED': True,
+    'SSE_MAX_SECONDS': 0.2,
+    'SSE_HEARTBEAT_SECONDS': 0.05,
+}
+
+
+def read_stream(response):
+    try:
+        return b''.join(response.streaming_content).decode()
+    finally:
+        response.close()
+
+
+@override_settings(**FAST_STREAM)
+class FollowEventsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_new_posts_of_followed_authors_are_pushed(self):
+        response = self.client.get(reverse('posts:follow_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        other = Post.objects.create(author=self.stranger, text='Чужой пост')
+        publish_post(post)
+        publish_post(other)
+        content = read_stream(response)
+        self.assertIn(f'id: {post.pk}\nevent: post\n', content)
+        self.assertIn(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            content
+        )
+        self.assertNotIn(f'id: {other.pk}\n', content)
+        self.assertIn(': ping', content)
+
+    def test_closed_stream_unsubscribes(self):
+        read_stream(self.client.get(reverse('posts:follow_events')))
+        self.assertNotIn(self.author.pk, hub.queues)
+
+    def test_missed_posts_are_sent_after_reconnect(self):
+        seen = Post.objects.create(author=self.author, text='Прочитанный')
+        missed = Post.objects.create(author=self.author, text='Пропущенный')
+        content = read_stream(self.client.get(
+            reverse('posts:follow_events'), HTTP_LAST_EVENT_ID=str(seen.pk)
+        ))
+        self.assertIn(f'id: {missed.pk}\n', content)
+        self.assertNotIn(f'id: {seen.pk}\n', content)
+
+    def test_guest_is_redirected(self):
+        response = Client().get(reverse('posts:follow_events'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(**FAST_STREAM)
+class PublishOnCommitTest(TransactionTestCase):
+    def test_post_create_notifies_followers(self):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        events = hub.subscribe([author.pk])
+        try:
+            client = Client()
+            client.force_login(author)
+            client.post(reverse('posts:post_create'), {'text': 'Свежий'})
+            event = events.get(timeout=1)
+        finally:
+            hub.unsubscribe(events, [author.pk])
+        self.assertEqual(event['author'], 'author')
+        self.assertEqual(
+            event['id'], Post.objects.get(text='Свежий').pk
+        )
+
+
+class EventsDisabledTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_user(username='reader'))
+
+    @override_settings(SSE_ENABLED=False)
+    def test_stream_is_off_by_setting(self):
+        response = self.client.get(reverse('posts:follow_events'))
+        self.assertEqual(response.status_code, 404)
+        page = self.client.get(reverse('posts:follow_index'))
+        self.assertNotContains(page, 'EventSource(')
+
+    @override_settings(SSE_ENABLED=True)
+    def test_page_subscribes_when_enabled(self):
+        page = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(page, 'EventSource(')
@@ -3,19 +3,26 @@
 Проверяет корректную работу форм.
 """
 import shutil
+import struct
 import tempfile
+import unittest
+from hashlib import sha256
+from io import BytesIO
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from PIL import Image, features
+
+from posts.images import strip_webp, too_large_message
 from posts.models import Post, Group, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -93,7 +100,7 @@ class PostCreateFormTests(TestCase):
             Post.objects.order_by('-id').filter(
                 text=new_text,
                 id=new_post_id,
-                image=f'posts/{new_uploaded.name}'
+                image=f'posts/{sha256(small_gif).hexdigest()}.gif'
             ).exists()
         )
 
@@ -133,7 +140,7 @@ class PostCreateFormTests(TestCase):
             Post.objects.order_by('-id').filter(
                 text=text_repl,
                 id=self.post.id,
-                image=f'posts/{uploaded_repl.name}'
+                image=f'posts/{sha256(small_gif_repl).hexdigest()}.gif'
             ).exists()
         )
 
@@ -178,7 +185,7 @@ class PostCreateFormTests(TestCase):
                 text=new_text,
                 group=self.post.group.id,
                 id=new_post_id,
-                image=f'posts/{new_uploaded.name}'
+                image=f'posts/{sha256(small_gif_2).hexdigest()}.gif'
             ).exists()
         )
 
@@ -220,7 +227,7 @@ class PostCreateFormTests(TestCase):
                 text=text_repl,
                 group=self.post.group.id,
                 id=self.post.id,
-                image=f'posts/{uploaded_repl.name}'
+                image=f'posts/{sha256(small_gif_repl_2).hexdigest()}.gif'
             ).exists()
         )
 
@@ -265,7 +272,7 @@ class PostCreateFormTests(TestCase):
                 text=new_text,
                 group=self.post.group.id,
                 id=new_post_id,
-                image=f'posts/{new_uploaded.name}'
+                image=f'posts/{sha256(small_gif_3).hexdigest()}.gif'
             ).exists()
         )
 
@@ -308,6 +315,180 @@ class PostCreateFormTests(TestCase):
                 text=text_repl,
                 group=self.post.group.id,
                 id=self.post.id,
-                image=f'posts/{uploaded_repl.name}'
+                image=f'posts/{sha256(small_gif_repl_3).hexdigest()}.gif'
             ).exists()
         )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    @staticmethod
+    def jpeg_with_exif(size=(8, 8)):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010E] = 'секретное описание'
+        Image.new('RGB', size, 'red').save(
+            buffer, 'JPEG', exif=exif.tobytes()
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def mpo(*colors):
+        """Снимок MPO из JPEG-кадров заданных цветов с таблицей MPF."""
+        frames = []
+        for color in colors:
+            buffer = BytesIO()
+            Image.new('RGB', (8, 8), color).save(buffer, 'JPEG')
+            frames.append(buffer.getvalue())
+        entries_offset = 8 + 2 + 3 * 12 + 4
+        ifd = struct.pack('>H', 3) + b''.join(
+            struct.pack('>HHI', tag, kind, count) + value
+            for tag, kind, count, value in (
+                (0xB000, 7, 4, b'0100'),
+                (0xB001, 4, 1, struct.pack('>I', len(frames))),
+                (0xB002, 7, 16 * len(frames),
+                 struct.pack('>I', entries_offset)),
+            )
+        ) + b'\0' * 4
+        length = 2 + 4 + entries_offset + 16 * len(frames)
+        # Смещения кадров отсчитываются от TIFF-заголовка внутри APP2.
+        header = 2 + 2 + 2 + 4
+        offsets, position = [], len(frames[0]) + 2 + length
+        for frame in frames[1:]:
+            offsets.append(position - header)
+            position += len(frame)
+        entries = struct.pack(
+            '>IIIHH', 0x20030000, len(frames[0]) + 2 + length, 0, 0, 0
+        ) + b''.join(
+            struct.pack('>IIIHH', 0x00020002, len(frame), offset, 0, 0)
+            for frame, offset in zip(frames[1:], offsets)
+        )
+        app2 = b'\xff\xe2' + struct.pack('>H', length) + b'MPF\0' + (
+            b'MM\x00\x2a' + struct.pack('>I', 8) + ifd + entries
+        )
+        return frames[0][:2] + app2 + frames[0][2:] + b''.join(frames[1:])
+
+    def create_post(self, content, name='photo.jpg'):
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(name, content, 'image/jpeg'),
+            }
+        )
+
+    def stored_image(self):
+        with Post.objects.get().image.open() as stored:
+            return stored.read()
+
+    def test_metadata_is_stripped_and_uploads_are_deduplicated(self):
+        """Метаданные удаляются, одинаковые картинки хранятся один раз."""
+        content = self.jpeg_with_exif()
+        self.create_post(content)
+        self.create_post(content, name='copy.jpg')
+        first, second = Post.objects.order_by('id')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{64}\.jpg$')
+        with first.image.open() as stored:
+            data = stored.read()
+        self.assertNotIn(b'Exif', data)
+        self.assertEqual(Image.open(BytesIO(data)).size, (8, 8))
+
+    def test_mpo_is_stored_as_first_frame(self):
+        """Снимок из нескольких кадров (MPO) хранится как JPEG."""
+        content = self.mpo('red', 'blue')
+        self.assertEqual(Image.open(BytesIO(content)).format, 'MPO')
+        self.create_post(content)
+        self.assertRegex(Post.objects.get().image.name, r'\.jpg$')
+        data = self.stored_image()
+        self.assertNotIn(b'MPF', data)
+        self.assertEqual(data.count(b'\xff\xd8'), 1)
+        stored = Image.open(BytesIO(data))
+        self.assertEqual(stored.format, 'JPEG')
+        red, green, blue = stored.convert('RGB').getpixel((0, 0))
+        self.assertGreater(red, blue)
+
+    @unittest.skipUnless(features.check('webp'), 'Pillow без WebP')
+    def test_webp_exif_is_stripped(self):
+        """Из WebP удаляется EXIF с координатами."""
+        exif = Image.Exif()
+        exif[0x010E] = 'секретное описание'
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(
+            buffer, 'WEBP', exif=exif.tobytes()
+        )
+        self.create_post(buffer.getvalue(), name='photo.webp')
+        data = self.stored_image()
+        self.assertNotIn(b'EXIF', data)
+        self.assertNotIn('секретное'.encode(), data)
+        self.assertEqual(Image.open(BytesIO(data)).size, (8, 8))
+
+    def test_webp_metadata_chunks_are_removed(self):
+        """Блоки EXIF и XMP убираются, флаги VP8X и размер RIFF верны."""
+        def chunk(name, payload):
+            return (
+                name + struct.pack('<I', len(payload)) + payload
+                + b'\0' * (len(payload) % 2)
+            )
+        vp8x = chunk(b'VP8X', bytes([0x0C]) + b'\0' * 9)
+        image = chunk(b'VP8L', b'pixels')
+        body = b'WEBP' + vp8x + chunk(b'EXIF', b'GPS 55.7') + image + chunk(
+            b'XMP ', b'<x:xmpmeta/>!'
+        )
+        data = strip_webp(b'RIFF' + struct.pack('<I', len(body)) + body)
+        expected = b'WEBP' + chunk(b'VP8X', b'\0' * 10) + image
+        self.assertEqual(
+            data, b'RIFF' + struct.pack('<I', len(expected)) + expected
+        )
+
+    def test_gif_comments_and_applications_are_stripped(self):
+        """Из GIF удаляются комментарии и XMP, анимация остаётся."""
+        frames = [Image.new('P', (8, 8), color) for color in range(3)]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:],
+            loop=0, comment=b'secret comment'
+        )
+        content = buffer.getvalue()
+        header = 13 + 3 * 2 ** ((content[10] & 0x07) + 1)
+        xmp = b'\x21\xff\x0bXMP DataXMP\x0aGPS 55.7 N\x00'
+        self.create_post(
+            content[:header] + xmp + content[header:], name='anim.gif'
+        )
+        data = self.stored_image()
+        self.assertNotIn(b'secret', data)
+        self.assertNotIn(b'GPS', data)
+        stored = Image.open(BytesIO(data))
+        self.assertEqual(stored.n_frames, 3)
+        self.assertEqual(stored.info['loop'], 0)
+
+    @override_settings(POSTS_IMAGE_MAX_BYTES=100)
+    def test_too_large_upload_is_rejected(self):
+        """Файл больше POSTS_IMAGE_MAX_BYTES не принимается."""
+        response = self.create_post(self.jpeg_with_exif((64, 64)))
+        self.assertFormError(
+            response, 'form', 'image', too_large_message()
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_is_rejected(self):
+        """Картинка с большим числом пикселей не принимается."""
+        response = self.create_post(self.jpeg_with_exif((20, 20)))
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 100 пикселей.'
+        )
@@ -2,10 +2,13 @@
 Тесты, написанные с помощью модуля unittest.
 Проверяет корректную работу models.py.
 """
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -68,3 +71,61 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, post):
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        author_stats = UserStats.objects.get(user=self.user)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        expected = {
+            post.comments_count: post.comments.count(),
+            self.group.posts_count: self.group.post_set.count(),
+            author_stats.posts_count: self.user.posts.count(),
+            author_stats.followers_count: self.user.following.count(),
+            reader_stats.following_count: self.reader.follower.count(),
+        }
+        for value, real in expected.items():
+            with self.subTest(real=real):
+                self.assertEqual(value, real)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounters(post)
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = None
+        post.save()
+        Comment.objects.all().delete()
+        Follow.objects.all().delete()
+        self.assertCounters(post)
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_recount_command_repairs_counters(self):
+        """Команда recount_counters исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.user, text='Текст', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Post.objects.update(comments_count=10)
+        UserStats.objects.all().delete()
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.assertIn('Post: исправлено строк — 1', out.getvalue())
+        self.assertCounters(post)
@@ -0,0 +1,82 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет, что страницы со списками постов
+не читают таблицы целиком.
+"""
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import encode_cursor
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(15):
+            post = Post.objects.create(
+                author=cls.user,
+                text=f'Запись {number}',
+                group=cls.group,
+            )
+        cls.post = post
+        cls.since = encode_cursor([post.pub_date, post.pk])
+        Comment.objects.create(post=post, author=cls.reader, text='Ок')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def full_scans(self, url):
+        """Запросы страницы, план которых читает таблицу целиком."""
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    if FULL_SCAN.match(row[-1]):
+                        scans.append(f'{row[-1]}: {sql}')
+        return scans
+
+    def test_listing_views_use_indexes(self):
+        """Страницы со списками постов читают только индексы."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:index_since') + f'?since={self.since}',
+            reverse('posts:follow_since') + f'?since={self.since}',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans(url), [])
@@ -0,0 +1,93 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет перестроение поискового индекса.
+"""
+from io import StringIO
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.admin import PostAdmin
+from posts.models import Comment, Post, SearchIndexProgress
+from posts.search import get_backend, search_posts, stem_rows, write_fresh
+
+User = get_user_model()
+
+
+class RebuildSearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Кошка номер {n}')
+            for n in range(5)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Собаки лучше'
+        )
+
+    def rebuild(self, *args):
+        out = StringIO()
+        call_command(
+            'rebuild_search_index', '--workers=1', '--chunk-size=2',
+            *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_rebuild_indexes_posts_and_comments(self):
+        """Команда заново строит индекс постов и комментариев."""
+        backend = get_backend()
+        backend.clear(Post)
+        backend.clear(Comment)
+        self.assertEqual(search_posts('кошки'), [])
+        out = self.rebuild('--restart')
+        self.assertCountEqual(
+            search_posts('кошки'), [post.pk for post in self.posts]
+        )
+        self.assertEqual(
+            search_posts('собака', Comment), [self.comment.pk]
+        )
+        self.assertIn('posts.post: проиндексировано записей — 5', out)
+        self.assertIn('posts.comment: проиндексировано записей — 1', out)
+
+    def test_rebuild_with_process_pool(self):
+        """Основы слов считаются в пуле процессов."""
+        get_backend().clear(Post)
+        out = self.rebuild('--restart', '--model=post', '--workers=2')
+        self.assertCountEqual(
+            search_posts('кошки'), [post.pk for post in self.posts]
+        )
+        self.assertIn('posts.post: проиндексировано записей — 5', out)
+
+    def test_rebuild_resumes_after_last_chunk(self):
+        """Команда продолжает с последней записанной порции."""
+        get_backend().clear(Post)
+        SearchIndexProgress.objects.create(
+            model='posts.post', last_pk=self.posts[1].pk
+        )
+        out = self.rebuild('--model=post')
+        self.assertIn(f'продолжение после pk={self.posts[1].pk}', out)
+        self.assertCountEqual(
+            search_posts('кошки'), [post.pk for post in self.posts[2:]]
+        )
+
+    @override_settings(POSTS_SEARCH_MAX_RESULTS=2)
+    def test_admin_search_is_not_capped(self):
+        """Админка находит все записи, даже сверх предела индекса."""
+        queryset, _ = PostAdmin(Post, admin.site).get_search_results(
+            None, Post.objects.all(), 'номер'
+        )
+        self.assertCountEqual(queryset, self.posts)
+
+    def test_stale_chunk_does_not_overwrite_new_text(self):
+        """Запись, изменённая после чтения порции, не затирается."""
+        post = self.posts[0]
+        rows = [(post.pk, post.text)]
+        stemmed = stem_rows(rows)
+        post.text = 'Попугай'
+        post.save()
+        write_fresh(Post, rows, stemmed)
+        self.assertEqual(search_posts('попугай'), [post.pk])
+        self.assertNotIn(post.pk, search_posts('кошка'))
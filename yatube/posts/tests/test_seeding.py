@@ -0,0 +1,84 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет заполнение базы командой seed_data.
+"""
+import random
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.cache import get_version, index_scope
+from posts.counters import repair_counters
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.search import search_posts
+from posts.seeding import seed, zipf_index
+
+
+class SeedDataTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.output = StringIO()
+        call_command(
+            'seed_data', '--users=20', '--groups=3', '--posts=200',
+            '--comments=300', '--follows=60', '--batch-size=50',
+            '--seed=1', stdout=cls.output
+        )
+
+    def test_rows_are_created(self):
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        self.assertIn('в секунду', self.output.getvalue())
+
+    def test_counters_are_consistent(self):
+        self.assertFalse(any(repair_counters().values()))
+
+    def test_feeds_are_filled(self):
+        follow = Follow.objects.first()
+        self.assertEqual(
+            FeedEntry.objects.filter(user=follow.user).count(),
+            Post.objects.filter(
+                author__following__user=follow.user
+            ).count()
+        )
+
+    def test_comments_follow_posts(self):
+        for comment in Comment.objects.select_related('post')[:50]:
+            self.assertGreaterEqual(comment.created, comment.post.pub_date)
+
+    def test_dates_are_automatic_again(self):
+        post = Post.objects.create(
+            text='Новый пост', author=User.objects.first()
+        )
+        self.assertIsNotNone(post.pub_date)
+
+    def test_posts_are_searchable(self):
+        post = Post.objects.last()
+        word = post.text.split()[0]
+        self.assertIn(post.pk, search_posts(word))
+
+    def test_seeding_twice_keeps_cache_and_search_index(self):
+        """
+        Повторное заполнение в ту же секунду не падает, сбрасывает
+        версии областей, а не весь кеш, и не стирает поисковый индекс.
+        """
+        cache.set('not-seeded', 'цело', None)
+        version = get_version(index_scope())
+        post = Post.objects.first()
+        word = post.text.split()[0]
+        for _ in range(2):
+            seed(users=3, groups=1, posts=5, comments=5, follows=2)
+        self.assertEqual(User.objects.count(), 26)
+        self.assertEqual(cache.get('not-seeded'), 'цело')
+        self.assertGreater(get_version(index_scope()), version)
+        self.assertIn(post.pk, search_posts(word))
+
+    def test_zipf_prefers_first_indexes(self):
+        rng = random.Random(1)
+        picks = [zipf_index(rng, 100, 1.2) for _ in range(1000)]
+        self.assertTrue(all(0 <= pick < 100 for pick in picks))
+        self.assertGreater(picks.count(0), picks.count(50) * 5)
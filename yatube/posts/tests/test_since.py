@@ -0,0 +1,94 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет выдачу постов новее курсора для обновления лент.
+"""
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+
+
+class PostsSinceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.old = Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def cursor(self, url_name):
+        return self.client.get(
+            reverse(url_name)
+        ).context['since_cursor']
+
+    def test_index_returns_only_new_posts(self):
+        since = self.cursor('posts:index')
+        new = Post.objects.create(author=self.stranger, text='Новый пост')
+        data = self.client.get(
+            reverse('posts:index_since'), {'since': since, 'format': 'json'}
+        ).json()
+        self.assertEqual([post['id'] for post in data['posts']], [new.pk])
+        self.assertTrue(data['complete'])
+        self.assertNotEqual(data['cursor'], since)
+        again = self.client.get(
+            reverse('posts:index_since'),
+            {'since': data['cursor'], 'format': 'json'}
+        ).json()
+        self.assertEqual(again['posts'], [])
+        self.assertEqual(again['cursor'], data['cursor'])
+
+    def test_html_fragment(self):
+        since = self.cursor('posts:follow_index')
+        response = self.client.get(
+            reverse('posts:follow_since'), {'since': since}
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['X-Since-Cursor'], since)
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        Post.objects.create(author=self.author, text='Пост подписки')
+        response = self.client.get(
+            reverse('posts:follow_since'), {'since': since}
+        )
+        self.assertContains(response, 'Пост подписки')
+        self.assertNotContains(response, 'Чужой пост')
+        self.assertNotContains(response, 'Старый пост')
+        self.assertEqual(response['X-Since-Complete'], '1')
+
+    @override_settings(POSTS_SINCE_LIMIT=2)
+    def test_result_is_capped(self):
+        since = self.cursor('posts:index')
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+        data = self.client.get(
+            reverse('posts:index_since'), {'since': since, 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [post['id'] for post in data['posts']],
+            [posts[2].pk, posts[1].pk]
+        )
+        self.assertFalse(data['complete'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(
+            reverse('posts:index_since'), {'since': 'мусор'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_cached_fragment_keeps_headers(self):
+        since = self.cursor('posts:index')
+        Post.objects.create(author=self.author, text='Новый пост')
+        guest = Client()
+        first = guest.get(reverse('posts:index_since'), {'since': since})
+        second = guest.get(reverse('posts:index_since'), {'since': since})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['X-Since-Cursor'], first['X-Since-Cursor'])
+        self.assertEqual(second['X-Since-Complete'], '1')
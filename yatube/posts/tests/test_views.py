@@ -4,15 +4,24 @@
 """
 import shutil
 import tempfile
+from unittest import mock
+from urllib.parse import quote
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
 from django import forms
+from PIL import Image
 
-from posts.models import Post, Group, Comment, Follow
+from posts.models import Post, Group, Comment, FeedEntry, Follow
+from posts.tests.utils import FeedQueriesMixin
+from posts.thumbnails import submit, thumbnail_formats, thumbnail_name
+from posts.utils import decode_cursor
 
 from yatube.settings import NUMBER_OF_RECORDS
 
@@ -21,7 +30,7 @@ User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
 class PostViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -75,6 +84,78 @@ class PostViewsTest(TestCase):
         self.authorized_client_3 = Client()
         self.authorized_client_3.force_login(self.user_3)
 
+    def test_thumbnail_is_served_from_storage(self):
+        """Лента выводит готовую миниатюру картинки поста."""
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        url = default_storage.url(thumbnail_name(self.post.image.name))
+        self.assertContains(response, f'src="{url}"')
+        for size in settings.POSTS_THUMBNAIL_SIZES:
+            for fmt in thumbnail_formats():
+                with self.subTest(size=size, fmt=fmt):
+                    name = thumbnail_name(self.post.image.name, size, fmt)
+                    self.assertTrue(default_storage.exists(name))
+                    self.assertContains(
+                        response, f'{default_storage.url(name)} {size[0]}w'
+                    )
+
+    def test_failed_thumbnail_replaces_cached_placeholder(self):
+        """
+        Когда миниатюра не построилась, закешированная заглушка
+        сменяется исходной картинкой.
+        """
+        cache.clear()
+        with self.post.image.open() as source:
+            content = source.read()
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с битой картинкой',
+            image=SimpleUploadedFile('broken.gif', content, 'image/gif')
+        )
+        # Пока миниатюра строится, лента кеширует заглушку.
+        with mock.patch('posts.thumbnails._in_progress', {post.image.name}):
+            response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, f'src="{post.image.url}"')
+        with mock.patch(
+            'posts.thumbnails.make_thumbnail', side_effect=OSError
+        ):
+            submit(post)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+
+    def test_extra_formats_are_offered_as_sources(self):
+        """Форматы кроме JPEG выводятся тегами <source> с srcset."""
+        with self.post.image.open() as source:
+            content = source.read()
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с WebP',
+            image=SimpleUploadedFile('webp.gif', content, 'image/gif')
+        )
+        # Сохранение WebP подменено JPEG: сборка Pillow может не уметь WebP.
+        with mock.patch.dict(Image.SAVE, {'WEBP': Image.SAVE['JPEG']}):
+            self.assertEqual(thumbnail_formats()[:1], ['webp'])
+            response = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            )
+        srcset = ', '.join(
+            '{} {}w'.format(
+                default_storage.url(
+                    thumbnail_name(post.image.name, size, 'webp')
+                ),
+                size[0]
+            )
+            for size in sorted(settings.POSTS_THUMBNAIL_SIZES, reverse=True)
+        )
+        self.assertContains(
+            response, f'<source type="image/webp" srcset="{srcset}"'
+        )
+        for size in settings.POSTS_THUMBNAIL_SIZES:
+            name = thumbnail_name(post.image.name, size, 'webp')
+            with self.subTest(name=name):
+                self.assertTrue(name.endswith(f'_{size[0]}x{size[1]}.webp'))
+                self.assertTrue(default_storage.exists(name))
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         templates_page_names = {
@@ -336,6 +417,7 @@ class PaginatorViewsTest(TestCase):
             )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -395,3 +477,299 @@ class PaginatorViewsTest(TestCase):
             ),
             leftover_pages
         )
+
+    def test_cursor_pages_follow_each_other(self):
+        """Курсоры after/before ведут на соседние страницы."""
+        first_page = self.client.get(reverse('posts:index')).context[
+            'page_obj'
+        ]
+        self.assertIsNone(first_page.previous_cursor)
+        response = self.client.get(
+            reverse('posts:index'), {'after': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(
+            len(second_page), Post.objects.count() % NUMBER_OF_RECORDS
+        )
+        self.assertIsNone(second_page.next_cursor)
+        self.assertEqual(
+            [post.pk for post in second_page],
+            list(
+                Post.objects.order_by('-pub_date', '-id').values_list(
+                    'pk', flat=True
+                )[NUMBER_OF_RECORDS:]
+            )
+        )
+        response = self.client.get(
+            reverse('posts:index'), {'before': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [post.pk for post in first_page]
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Повреждённый курсор открывает первую страницу."""
+        response = self.client.get(reverse('posts:index'), {'after': '!!'})
+        self.assertEqual(len(response.context['page_obj']), NUMBER_OF_RECORDS)
+
+    def test_cursor_with_impossible_date_returns_first_page(self):
+        """Курсор с несуществующей датой открывает первую страницу."""
+        cursor = urlsafe_base64_encode(b'["2020-13-45T00:00:00",1]')
+        self.assertIsNone(decode_cursor(cursor, ('pub_date', 'id')))
+        response = self.client.get(reverse('posts:index'), {'after': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), NUMBER_OF_RECORDS)
+
+    def test_cursor_with_huge_id_is_broken(self):
+        """Курсор с id за пределами 64 бит не доходит до базы."""
+        cursor = urlsafe_base64_encode(
+            b'["2020-01-01T00:00:00+00:00",99999999999999999999999]'
+        )
+        self.assertIsNone(decode_cursor(cursor, ('pub_date', 'id')))
+        for param in ('after', 'before'):
+            with self.subTest(param=param):
+                response = self.client.get(
+                    reverse('posts:index'), {param: cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse('posts:index_since'), {'since': cursor}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'after': cursor}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_page_beyond_feed_returns_last_page(self):
+        """Номер страницы за пределами ленты открывает самые старые."""
+        last_pks = list(
+            Post.objects.order_by('pub_date', 'id').values_list(
+                'pk', flat=True
+            )[:NUMBER_OF_RECORDS]
+        )[::-1]
+        for page in ('3', '99999999999999999999999'):
+            with self.subTest(page=page):
+                response = self.client.get(
+                    reverse('posts:index'), {'page': page}
+                )
+                self.assertEqual(response.status_code, 200)
+                page_obj = response.context['page_obj']
+                self.assertEqual([post.pk for post in page_obj], last_pks)
+                self.assertIsNone(page_obj.next_cursor)
+                self.assertIsNotNone(page_obj.previous_cursor)
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Kumir')
+        cls.user = User.objects.create_user(username='Poklonik')
+        Post.objects.create(author=cls.author, text='Старая запись')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def feed_texts(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_posts_are_fanned_out_to_followers(self):
+        """Посты автора попадают в ленту подписчика при записи."""
+        Post.objects.create(author=self.author, text='Новая запись')
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 2
+        )
+        self.assertEqual(self.feed_texts(), ['Новая запись', 'Старая запись'])
+
+    def test_unfollow_clears_feed(self):
+        """После отписки лента пользователя пустеет."""
+        Follow.objects.filter(user=self.user).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.feed_texts(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_merged_on_read(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        Post.objects.create(author=self.author, text='Новая запись')
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.user).count(), 1
+        )
+        self.assertEqual(self.feed_texts(), ['Новая запись', 'Старая запись'])
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_feeds_are_rebuilt_when_author_drops_to_limit(self):
+        """
+        Когда подписчиков снова не больше предела, посты и подписки
+        времени популярности попадают в ленты.
+        """
+        fan = User.objects.create_user(username='Fanat')
+        late = User.objects.create_user(username='Opozdavshiy')
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=late, author=self.author)
+        Post.objects.create(author=self.author, text='Популярная запись')
+        self.assertEqual(
+            self.feed_texts(), ['Популярная запись', 'Старая запись']
+        )
+        Follow.objects.filter(user=fan).delete()
+        self.assertEqual(
+            self.feed_texts(), ['Популярная запись', 'Старая запись']
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user=late).count(), 2
+        )
+
+
+class FeedQueriesTest(FeedQueriesMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Chitatel')
+        cls.author = User.objects.create_user(username='Kumir')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(12):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Запись {number}',
+                group=Group.objects.create(
+                    title=f'Группа {number}',
+                    slug=f'slug-{number}',
+                    description='Тестовое описание',
+                ) if number % 2 else cls.group,
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_listing_queries_do_not_depend_on_page_size(self):
+        """Ленты выполняют одинаковое число запросов на любую страницу."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertFixedQueriesPerPage(
+                    self.authorized_client, url, large=5
+                )
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый текст')
+        for number in range(3):
+            Comment.objects.create(
+                post=cls.post, author=cls.user, text=f'Коммент {number}'
+            )
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста выводятся первые комментарии."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            ['Коммент 0', 'Коммент 1']
+        )
+        self.assertContains(
+            response,
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        )
+
+    def test_load_more_comments(self):
+        """Следующие комментарии отдаются фрагментом и в JSON."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(first['comments']), 2)
+        response = self.client.get(url, {'after': first['next']})
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertContains(response, 'Коммент 2')
+        self.assertNotContains(response, 'Коммент 1')
+        last = self.client.get(
+            url, {'after': first['next'], 'format': 'json'}
+        ).json()
+        self.assertEqual(
+            [comment['text'] for comment in last['comments']], ['Коммент 2']
+        )
+        self.assertIsNone(last['next'])
+
+    def test_load_more_for_missing_post(self):
+        """Для несуществующего поста возвращается 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(NUMBER_OF_RECORDS=2)
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='HasNoName')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты и кошки гуляют сами по себе'
+        )
+        cls.cat = Post.objects.create(author=cls.user, text='Про кота')
+        cls.dogs = Post.objects.create(author=cls.user, text='Собаки лают')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('posts:search'), {'q': query, **params})
+
+    def test_search_uses_stems(self):
+        """Поиск находит другие формы слова и не находит лишнего."""
+        response = self.search('котами')
+        self.assertTemplateUsed(response, 'posts/search.html')
+        found = {post.pk for post in response.context['page_obj']}
+        self.assertEqual(found, {self.cats.pk, self.cat.pk})
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении поста."""
+        post = Post.objects.create(author=self.user, text='Лошади скачут')
+        self.assertEqual(
+            [found.pk for found in self.search('лошадь').context['page_obj']],
+            [post.pk]
+        )
+        post.text = 'Пони скачут'
+        post.save()
+        self.assertFalse(self.search('лошадь').context['page_obj'])
+        post.delete()
+        self.assertFalse(self.search('пони').context['page_obj'])
+
+    def test_search_pages(self):
+        """Результаты разбиты по страницам, запрос сохраняется в ссылках."""
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Собака {number}')
+        response = self.search('собаки')
+        self.assertEqual(response.context['page_obj'].paginator.count, 4)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertContains(
+            response, '?q={}&page=2'.format(quote('собаки'))
+        )
+        self.assertEqual(
+            len(self.search('собаки', page=2).context['page_obj']), 2
+        )
+
+    def test_search_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не вызывают ошибку."""
+        for query in ('"кот', 'кот AND OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
@@ -0,0 +1,23 @@
+"""Вспомогательные проверки для тестов приложения posts."""
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class FeedQueriesMixin:
+    """Проверка, что число запросов ленты не зависит от размера страницы."""
+    def count_queries(self, client, url, per_page):
+        cache.clear()
+        with override_settings(NUMBER_OF_RECORDS=per_page):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+        self.assertEqual(len(response.context['page_obj']), per_page)
+        return len(context.captured_queries)
+
+    def assertFixedQueriesPerPage(self, client, url, small=1, large=10):
+        self.assertEqual(
+            self.count_queries(client, url, small),
+            self.count_queries(client, url, large),
+            f'Число запросов страницы {url} зависит от числа постов на ней'
+        )
@@ -0,0 +1,211 @@
+"""
+Приложение posts отвечает за работу сайта.
+В thumbnails.py реализована подготовка миниатюр картинок постов.
+
+Миниатюры строятся в фоновом пуле потоков сразу после сохранения
+картинки, поэтому запрос страницы никогда не декодирует изображение.
+Картинка декодируется один раз, из неё получаются все размеры
+POSTS_THUMBNAIL_SIZES во всех форматах POSTS_THUMBNAIL_FORMATS,
+которые умеет сохранять Pillow; JPEG строится всегда и служит
+запасным вариантом. Пока миниатюры не готовы, шаблоны выводят заглушку,
+а если построить их не удалось — исходную картинку.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_version, post_scopes
+from .feed import feed_scopes
+
+logger = logging.getLogger(__name__)
+
+FAILED_KEY = 'posts:thumbnail-failed:{}'
+FAILED_TIMEOUT = 60 * 60
+
+FALLBACK_FORMAT = 'jpeg'
+
+FORMATS = {
+    'avif': ('avif', 'image/avif', {'quality': 60}),
+    'webp': ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': (
+        'jpg', 'image/jpeg', {'quality': 85, 'optimize': True,
+                              'progressive': True}
+    ),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_progress = set()
+
+
+def thumbnail_sizes():
+    """Размеры миниатюр от большего к меньшему."""
+    return sorted(settings.POSTS_THUMBNAIL_SIZES, reverse=True)
+
+
+def thumbnail_formats():
+    """
+    Форматы миниатюр, которые умеет сохранять установленный Pillow.
+    Запасной JPEG всегда последний.
+    """
+    Image.init()
+    formats = [
+        fmt for fmt in settings.POSTS_THUMBNAIL_FORMATS
+        if fmt in FORMATS and fmt != FALLBACK_FORMAT
+        and fmt.upper() in Image.SAVE
+    ]
+    return formats + [FALLBACK_FORMAT]
+
+
+def thumbnail_name(image_name, size=None, fmt=FALLBACK_FORMAT):
+    """
+    Имя файла миниатюры картинки image_name.
+    Без size — самая большая миниатюра, она записывается последней
+    и показывает, что готовы все варианты.
+    """
+    width, height = size or thumbnail_sizes()[0]
+    base = os.path.splitext(image_name)[0]
+    return f'thumbnails/{base}_{width}x{height}.{FORMATS[fmt][0]}'
+
+
+def _save(storage, name, image, fmt):
+    buffer = BytesIO()
+    image.save(buffer, fmt.upper(), **FORMATS[fmt][2])
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def make_thumbnail(storage, image_name):
+    """
+    Строит все миниатюры за одно декодирование картинки:
+    обрезка по центру с увеличением, как в шаблонах.
+    """
+    with storage.open(image_name) as source:
+        image = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+    sizes = thumbnail_sizes()
+    formats = thumbnail_formats()
+    largest = ImageOps.fit(image, sizes[0], Image.LANCZOS)
+    variants = [(sizes[0], largest)] + [
+        (size, ImageOps.fit(largest, size, Image.LANCZOS))
+        for size in sizes[1:]
+    ]
+    for size, variant in reversed(variants):
+        for fmt in formats:
+            _save(
+                storage, thumbnail_name(image_name, size, fmt), variant, fmt
+            )
+
+
+def _run(storage, image_name, scopes):
+    try:
+        make_thumbnail(storage, image_name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', image_name)
+        cache.set(FAILED_KEY.format(image_name), True, FAILED_TIMEOUT)
+    finally:
+        _in_progress.discard(image_name)
+    # Закешированные фрагменты страниц содержат заглушку.
+    bump_version(*scopes)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def pinned_storage(storage):
+    """
+    Хранилище с зафиксированным каталогом.
+    FileSystemStorage заново читает MEDIA_ROOT после смены настроек,
+    а фоновая задача должна писать туда, где лежит картинка.
+    """
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemStorage(
+            location=storage.location, base_url=storage.base_url
+        )
+    return storage
+
+
+def submit(post):
+    """
+    Ставит построение миниатюры картинки поста в очередь.
+    При POSTS_THUMBNAIL_WORKERS = 0 миниатюра строится сразу.
+    """
+    storage, image_name = pinned_storage(post.image.storage), post.image.name
+    if image_name in _in_progress:
+        return
+    _in_progress.add(image_name)
+    args = (storage, image_name, post_scopes(post) | feed_scopes(post))
+    if settings.POSTS_THUMBNAIL_WORKERS:
+        _get_executor().submit(_run, *args)
+    else:
+        _run(*args)
+
+
+def schedule_thumbnail(post):
+    """Строит миниатюру картинки поста после фиксации транзакции."""
+    if post.image:
+        transaction.on_commit(lambda: submit(post))
+
+
+def thumbnail_failed(post):
+    """Проверяет, что миниатюры картинки поста недавно не построились."""
+    return bool(post.image) and bool(
+        cache.get(FAILED_KEY.format(post.image.name))
+    )
+
+
+def thumbnail_sources(post):
+    """
+    Варианты миниатюр картинки поста для тега <picture>
+    или None, пока они не готовы.
+    Для картинки без миниатюр построение ставится в очередь.
+    """
+    if not post.image:
+        return None
+    name = thumbnail_name(post.image.name)
+    storage = post.image.storage
+    if not storage.exists(name):
+        if thumbnail_failed(post):
+            return None
+        submit(post)
+        if not storage.exists(name):
+            return None
+    sizes = thumbnail_sizes()
+    sources = [
+        {
+            'type': FORMATS[fmt][1],
+            'srcset': ', '.join(
+                '{} {}w'.format(
+                    storage.url(thumbnail_name(post.image.name, size, fmt)),
+                    size[0]
+                )
+                for size in sizes
+            ),
+        }
+        for fmt in thumbnail_formats()
+    ]
+    width, height = sizes[0]
+    return {
+        'url': storage.url(name),
+        'sources': sources[:-1],
+        'srcset': sources[-1]['srcset'],
+        'width': width,
+        'height': height,
+    }
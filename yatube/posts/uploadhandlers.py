@@ -0,0 +1,38 @@
+"""
+Приложение posts отвечает за работу сайта.
+В uploadhandlers.py реализован обработчик загрузок с ограничением
+размера: данные сверх POSTS_IMAGE_MAX_BYTES не читаются в память
+и не пишутся во временные файлы.
+"""
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class TooLargeUploadedFile(SimpleUploadedFile):
+    """Пустой файл на месте загрузки, превысившей ограничение."""
+    too_large = True
+
+
+class LimitedUploadHandler(FileUploadHandler):
+    """
+    Первый обработчик в FILE_UPLOAD_HANDLERS.
+    Пропускает данные файла дальше, пока не превышен лимит;
+    после этого отдаёт форме TooLargeUploadedFile.
+    """
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.too_large:
+            return None
+        if start + len(raw_data) > settings.POSTS_IMAGE_MAX_BYTES:
+            self.too_large = True
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.too_large:
+            return None
+        return TooLargeUploadedFile(self.file_name, b'', self.content_type)
@@ -10,6 +10,8 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('since/', views.index_since, name='index_since'),
+    path('search/', views.search, name='search'),
     path(
         'group/<slug:slug>/',
         views.group,
@@ -35,11 +37,18 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/events/', views.follow_events, name='follow_events'),
+    path('follow/since/', views.follow_since, name='follow_since'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
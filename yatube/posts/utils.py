@@ -1,12 +1,257 @@
-"""Приложение posts отвечает за работу сайта."""
-from django.core.paginator import Paginator
+"""
+Приложение posts отвечает за работу сайта.
+В utils.py реализовано разбитие постов по страницам.
 
-from yatube.settings import NUMBER_OF_RECORDS
+Страницы строятся по ключу (pub_date, id): вместо COUNT(*) и OFFSET
+каждая страница выбирается одним запросом по индексу, поэтому
+дальние страницы ленты открываются так же быстро, как первая.
+Ссылки между страницами содержат непрозрачные курсоры
+`?after=`/`?before=`; старые ссылки вида `?page=N` продолжают работать.
+"""
+import json
 
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 
-def paginator(request, post_list):
+# Ключи и смещения в базе — знаковые 64-битные целые: значения за их
+# пределами SQLite не принимает в запросе.
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключа строки в непрозрачный курсор."""
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values],
+        separators=(',', ':')
+    )
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token, fields):
+    """
+    Распаковывает курсор, созданный encode_cursor.
+    Для повреждённого курсора возвращает None.
+    """
+    try:
+        values = json.loads(urlsafe_base64_decode(token).decode())
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        date_value = parse_datetime(str(values[0]))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if date_value is None or type(values[1]) is not int:
+        return None
+    if not -MAX_INTEGER - 1 <= values[1] <= MAX_INTEGER:
+        return None
+    return [date_value, values[1]]
+
+
+class CursorPaginator(Paginator):
+    """
+    Пагинатор по ключу сортировки без COUNT(*) и OFFSET.
+
+    По умолчанию записи идут от новых к старым по (pub_date, id).
+    Свойства count и num_pages унаследованы от Paginator и по-прежнему
+    выполняют COUNT(*), поэтому шаблоны ленты к ним не обращаются.
+    """
+    def __init__(self, object_list, per_page,
+                 fields=('pub_date', 'id'), descending=True):
+        self.fields = fields
+        self.descending = descending
+        super().__init__(object_list.order_by(*self._ordering()), per_page)
+
+    def _ordering(self, reverse=False):
+        descending = self.descending != reverse
+        return [('-' if descending else '') + field for field in self.fields]
+
+    def _seek(self, values, reverse=False):
+        """
+        Условие "строго после ключа values" в выбранном направлении.
+        Отдельная граница по первому полю даёт базе диапазон индекса,
+        иначе поиск шёл бы по индексу с самого начала.
+        """
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        first, second = self.fields
+        return Q(**{f'{first}__{lookup[:2]}e': values[0]}) & (
+            Q(**{f'{first}__{lookup}': values[0]})
+            | Q(**{first: values[0], f'{second}__{lookup}': values[1]})
+        )
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _build_page(self, rows, number, has_next, has_previous):
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(self._key(rows[-1])) if rows and has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(self._key(rows[0])) if rows and has_previous
+            else None
+        )
+        return page
+
+    def first_page(self):
+        rows = list(
+            self.object_list.order_by(*self._ordering())[:self.per_page + 1]
+        )
+        return self._build_page(
+            rows[:self.per_page], 1, len(rows) > self.per_page, False
+        )
+
+    def page_after(self, values, number=None):
+        """Страница из записей, идущих сразу после ключа values."""
+        rows = list(
+            self.object_list.filter(
+                self._seek(values)
+            ).order_by(*self._ordering())[:self.per_page + 1]
+        )
+        return self._build_page(
+            rows[:self.per_page], number, len(rows) > self.per_page, True
+        )
+
+    def page_before(self, values):
+        """Страница из записей, идущих сразу перед ключом values."""
+        rows = list(
+            self.object_list.filter(
+                self._seek(values, reverse=True)
+            ).order_by(*self._ordering(reverse=True))[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not has_previous:
+            return self.first_page()
+        return self._build_page(rows, None, True, has_previous)
+
+    def last_page(self):
+        """Последняя страница: per_page самых старых в порядке записей."""
+        rows = list(
+            self.object_list.order_by(
+                *self._ordering(reverse=True)
+            )[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        return self._build_page(
+            rows[:self.per_page][::-1], None, False, has_previous
+        )
+
+    def page_by_number(self, number):
+        """
+        Совместимость со ссылками `?page=N`.
+        Смещение применяется только к колонкам ключа, после чего
+        страница выбирается так же, как по курсору. Номер за пределами
+        ленты, как и в Paginator.get_page, даёт последнюю страницу.
+        """
+        if number <= 1:
+            return self.first_page()
+        offset = (number - 1) * self.per_page - 1
+        if offset >= MAX_INTEGER:
+            return self.last_page()
+        boundary = self.object_list.order_by(
+            *self._ordering()
+        ).values_list(*self.fields)[offset:offset + 1]
+        boundary = list(boundary)
+        if not boundary:
+            return self.last_page()
+        return self.page_after(boundary[0], number)
+
+    def rows_before(self, values, limit):
+        """
+        Не больше limit записей, идущих перед ключом values, в порядке
+        пагинатора: для ленты — записи новее ключа, самые новые первыми.
+        Второе значение — поместились ли в limit все такие записи.
+        """
+        rows = list(
+            self.object_list.filter(
+                self._seek(values, reverse=True)
+            ).order_by(*self._ordering())[:limit + 1]
+        )
+        return rows[:limit], len(rows) <= limit
+
+    def cursor_of(self, obj):
+        """Курсор, указывающий на запись obj."""
+        return encode_cursor(self._key(obj))
+
+    def page_state(self, page):
+        """Содержимое страницы для хранения в кеше."""
+        return (
+            list(page.object_list),
+            page.number,
+            page.next_cursor,
+            page.previous_cursor
+        )
+
+    def restore_page(self, state):
+        """Страница, восстановленная из page_state без запросов к базе."""
+        rows, number, next_cursor, previous_cursor = state
+        page = Page(rows, number, self)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+    def get_page_from_request(self, request):
+        """Выбирает страницу по параметрам after, before или page."""
+        after = request.GET.get('after')
+        before = request.GET.get('before')
+        if after:
+            values = decode_cursor(after, self.fields)
+            if values is not None:
+                return self.page_after(values)
+        elif before:
+            values = decode_cursor(before, self.fields)
+            if values is not None:
+                return self.page_before(values)
+        else:
+            try:
+                return self.page_by_number(int(request.GET.get('page', 1)))
+            except (TypeError, ValueError):
+                pass
+        return self.first_page()
+
+
+def page_key(page):
+    """
+    Ключ отрисованной страницы для кеширования фрагментов: курсор её
+    первой записи, у первой страницы — None. Любые ссылки на одни
+    и те же записи дают один ключ, а неверные параметры открывают
+    первую страницу, поэтому фрагментов не больше, чем записей.
+    """
+    if page.number == 1 or not page.object_list:
+        return None
+    return page.paginator.cursor_of(page.object_list[0])
+
+
+def paginator(request, post_list, fields=('pub_date', 'id')):
     """Функция, в которой реализовано разбитие постов по страницам."""
-    paginator = Paginator(post_list, NUMBER_OF_RECORDS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    paginator = CursorPaginator(
+        post_list, settings.NUMBER_OF_RECORDS, fields
+    )
+    return paginator.get_page_from_request(request)
+
+
+def since_cursor(page):
+    """
+    Курсор самой новой записи первой страницы ленты: с ним клиент
+    запрашивает только записи, появившиеся после загрузки страницы.
+    """
+    if page.number != 1 or not page.object_list:
+        return None
+    return page.paginator.cursor_of(page.object_list[0])
+
+
+def comment_paginator(request, comment_list):
+    """Разбитие комментариев по страницам, от старых к новым."""
+    paginator = CursorPaginator(
+        comment_list,
+        settings.COMMENTS_PER_PAGE,
+        ('created', 'id'),
+        descending=False
+    )
+    return paginator.get_page_from_request(request)
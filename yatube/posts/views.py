@@ -4,56 +4,183 @@
 которая включает себя все записи по одной группе;
 записи, принадлежащие одному пользователю;
 страница для отдельного поста;
-страница создания поста; страница редактирования поста.
+страница создания поста; страница редактирования поста;
+страница поиска по постам.
 Реализованы функции подписки на/отписки от автора,
+поток уведомлений о новых постах подписок,
 комментирования записей для авторизированных пользователей.
 """
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 
+from core.concurrency import gather
+
+from .cache import (
+    get_version, group_scope, index_scope, post_scope, profile_scope
+)
+from .counters import user_stats
+from .decorators import anonymous_page_cache
+from .events import EventStream
+from .feed import FEED_FIELDS, feed_page, follow_feed
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Comment, Follow
-from .utils import paginator
+from .search import search_posts
+from .thumbnails import schedule_thumbnail
+from .utils import (
+    CursorPaginator, comment_paginator, decode_cursor, page_key, paginator,
+    since_cursor
+)
+
+
+def index_scopes(request):
+    return [index_scope()]
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return None if group_id is None else [group_scope(group_id)]
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return None if author_id is None else [profile_scope(author_id)]
 
 
+def post_detail_scopes(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [post_scope(post_id), profile_scope(author_id)]
+
+
+@anonymous_page_cache(index_scopes)
 def index(request):
     """
     Функция, отвечающая за главную страницу сайта.
     Реализовано разбитие записей по страницам.
     """
-    post_list = Post.objects.select_related(
-        'group'
-    ).select_related(
-        'author'
-    ).all().order_by('-pub_date')
+    post_list = Post.objects.for_feed()
     page_obj = paginator(request, post_list)
-    page_number = request.GET.get('page')
+    page_number = page_key(page_obj)
     index = True
     context = {
         'page_obj': page_obj,
         'index': index,
-        'page_number': page_number
+        'page_number': page_number,
+        'cache_version': get_version(index_scope()),
+        'since_cursor': since_cursor(page_obj)
     }
     return render(request, 'posts/index.html', context)
 
 
+def posts_since(request, post_list, fields=('pub_date', 'id')):
+    """
+    Посты новее курсора ?since=, самые новые первыми, не больше
+    POSTS_SINCE_LIMIT. HTML-фрагмент для вставки в начало ленты
+    или JSON при ?format=json. Курсор самого нового поста и признак
+    того, что вернулись все новые посты, отдаются в JSON и в заголовках
+    X-Since-Cursor и X-Since-Complete; без новых постов фрагмент пуст
+    (ответ 204).
+    """
+    since = request.GET.get('since', '')
+    values = decode_cursor(since, fields)
+    if values is None:
+        return HttpResponseBadRequest('Неверный курсор since.')
+    feed = CursorPaginator(post_list, settings.NUMBER_OF_RECORDS, fields)
+    posts, complete = feed.rows_before(values, settings.POSTS_SINCE_LIMIT)
+    cursor = feed.cursor_of(posts[0]) if posts else since
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'posts': [
+                {
+                    'id': post.pk,
+                    'author': post.author.username,
+                    'group': post.group.slug if post.group else None,
+                    'text': post.text,
+                    'pub_date': post.pub_date,
+                    'url': reverse(
+                        'posts:post_detail', kwargs={'post_id': post.pk}
+                    ),
+                }
+                for post in posts
+            ],
+            'cursor': cursor,
+            'complete': complete,
+        })
+    if posts:
+        response = render(
+            request, 'posts/includes/feed_since.html', {'posts': posts}
+        )
+    else:
+        response = HttpResponse(status=204)
+    response['X-Since-Cursor'] = cursor
+    response['X-Since-Complete'] = int(complete)
+    return response
+
+
+@anonymous_page_cache(index_scopes)
+def index_since(request):
+    """Функция, отвечающая за новые посты главной страницы."""
+    return posts_since(request, Post.objects.for_feed())
+
+
+def search(request):
+    """
+    Функция, отвечающая за страницу поиска по постам.
+    Найденные посты идут по релевантности, по страницам.
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = Paginator(
+        search_posts(query), settings.NUMBER_OF_RECORDS
+    ).get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    context = {
+        'page_obj': page_obj,
+        'query': query
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@anonymous_page_cache(group_scopes)
 def group(request, slug):
     """
     Функция, отвечающая за страницу сайта,
     которая включает себя все записи по одной группе.
     Реализовано разбитие записей по страницам.
     """
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).order_by('-pub_date')
-    page_obj = paginator(request, post_list)
+    group, page_obj = gather(
+        lambda: get_object_or_404(Group, slug=slug),
+        lambda: paginator(
+            request, Post.objects.for_feed().filter(group__slug=slug)
+        )
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'page_number': page_key(page_obj),
+        'cache_version': get_version(group_scope(group.pk))
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@anonymous_page_cache(profile_scopes)
 def profile(request, username):
     """
     Функция, отвечающая за страницу сайта,
@@ -61,31 +188,47 @@ def profile(request, username):
     Реализовано разбитие записей по страницам.
     Функция подписки/отписки для авторизированных пользователей.
     """
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author).order_by('-pub_date')
-    page_obj = paginator(request, post_list)
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(user=request.user, author=author).exists()
+    author, page_obj, following = gather(
+        lambda: get_object_or_404(
+            User.objects.select_related('stats'), username=username
+        ),
+        lambda: paginator(
+            request, Post.objects.for_feed().filter(author__username=username)
+        ),
+        lambda: (
+            request.user.is_authenticated
+            and Follow.objects.filter(
+                user=request.user, author__username=username
+            ).exists()
+        )
     )
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'following': following,
+        'stats': user_stats(author),
+        'page_number': page_key(page_obj),
+        'cache_version': get_version(profile_scope(author.pk))
     }
     return render(request, 'posts/profile.html', context)
 
 
+@anonymous_page_cache(post_detail_scopes)
 def post_detail(request, post_id):
     """
     Функция, отвечающая за страницу отдельного поста.
     Реализовано комментирование записи для авторизированных пользователей.
     """
     user = request.user
-    post = get_object_or_404(Post, pk=post_id)
+    post, comments = gather(
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            pk=post_id
+        ),
+        lambda: comment_paginator(request, comments_of(post_id))
+    )
     author = post.author
-    post_count = Post.objects.filter(author=author).count()
-    comments = Comment.objects.filter(post_id=post_id)
+    post_count = user_stats(author).posts_count
     form = CommentForm(request.POST)
     context = {
         'post': post,
@@ -99,6 +242,40 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_of(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'post_id', 'author__username')
+
+
+def post_comments(request, post_id):
+    """
+    Функция, отвечающая за подгрузку следующей страницы комментариев.
+    Возвращает HTML-фрагмент или JSON при ?format=json.
+    """
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = comment_paginator(request, comments_of(post_id))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.pk,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    return render(
+        request,
+        'posts/includes/comment_list.html',
+        {'comments': comments, 'post_id': post_id}
+    )
+
+
 @login_required
 @csrf_exempt
 def post_create(request):
@@ -111,6 +288,7 @@ def post_create(request):
         form = form.save(False)
         form.author = request.user
         form.save()
+        schedule_thumbnail(form)
         return redirect('posts:profile', username=form.author)
     return render(
         request,
@@ -136,6 +314,8 @@ def post_edit(request, post_id):
         instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect('posts:post_detail', post_id=post.pk)
     return render(
         request,
@@ -167,19 +347,52 @@ def follow_index(request):
     Функция, отвечающая отображения подписок
     авторизированного пользователя на главной страницы.
     Только для авторизированных пользователей.
+    Страницы ленты кешируются для каждого пользователя.
     """
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).order_by('-pub_date')
-    page_obj = paginator(request, post_list)
+    page_obj = feed_page(request)
     follow = True
     context = {
         'page_obj': page_obj,
-        'follow': follow
+        'follow': follow,
+        'since_cursor': since_cursor(page_obj),
+        'events_enabled': settings.SSE_ENABLED
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def follow_since(request):
+    """
+    Функция, отвечающая за новые посты ленты подписок.
+    Только для авторизированных пользователей.
+    """
+    return posts_since(
+        request, follow_feed(request.user).for_feed(), FEED_FIELDS
+    )
+
+
+@login_required
+def follow_events(request):
+    """
+    Функция, отвечающая за поток уведомлений о новых постах подписок
+    (server-sent events). Только для авторизированных пользователей.
+    Без SSE_ENABLED поток не открывается.
+    """
+    if not settings.SSE_ENABLED:
+        raise Http404
+    try:
+        last_id = int(request.META['HTTP_LAST_EVENT_ID'])
+    except (KeyError, ValueError):
+        last_id = None
+    response = StreamingHttpResponse(
+        EventStream(request.user, last_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     """
@@ -1,16 +1,65 @@
 """
 Приложение users отвечает за работу с пользователем:
 регистрация, авторизация, восстановление пароля.
-В forms.py описана форма для заполнения
-для регистрации.
+В forms.py описаны формы для заполнения
+для регистрации и сброса пароля.
 """
-from django.contrib.auth.forms import UserCreationForm
+import hashlib
+import time
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+from django.core.cache import caches
 
 User = get_user_model()
 
+RESET_KEY = 'users:password-reset:{}'
+
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+def reset_allowed(email):
+    """
+    Учитывает запрос сброса пароля для адреса email и проверяет,
+    что за PASSWORD_RESET_RATE_WINDOW их было не больше
+    PASSWORD_RESET_RATE_LIMIT.
+    Начало окна записывается через add, а запросы считаются атомарным
+    incr счётчика этого окна, поэтому процессы сайта не превышают
+    лимит вместе. Счётчик привязан к началу окна: incr некоторых
+    бэкендов кеша сбрасывает время жизни ключа, и оно восстанавливается
+    после каждого запроса.
+    """
+    rate_cache = caches[settings.PASSWORD_RESET_RATE_CACHE]
+    key = RESET_KEY.format(
+        hashlib.sha256(email.strip().lower().encode()).hexdigest()
+    )
+    window = settings.PASSWORD_RESET_RATE_WINDOW
+    now = time.time()
+    rate_cache.add(key, now, window)
+    started = rate_cache.get(key, now)
+    count_key = f'{key}:{started}'
+    rate_cache.add(count_key, 0, window)
+    try:
+        count = rate_cache.incr(count_key)
+    except ValueError:
+        count = 1
+        rate_cache.set(count_key, count, window)
+    rate_cache.touch(count_key, max(started + window - now, 1))
+    return count <= settings.PASSWORD_RESET_RATE_LIMIT
+
+
+class ResetForm(PasswordResetForm):
+    """
+    Форма сброса пароля с ограничением числа писем на адрес.
+    Сверх лимита письмо не отправляется, а пользователь видит ту же
+    страницу, что и при отправке.
+    """
+
+    def save(self, *args, **kwargs):
+        if reset_allowed(self.cleaned_data['email']):
+            super().save(*args, **kwargs)
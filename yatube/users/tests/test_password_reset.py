@@ -0,0 +1,89 @@
+"""
+Тесты, написанные с помощью модуля unittest.
+Проверяет отправку писем сброса пароля через очередь
+и ограничение числа писем на адрес.
+"""
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Mail
+
+User = get_user_model()
+
+
+class PasswordResetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            username='reader', email='reader@ya.ru', password='pass'
+        )
+        User.objects.create_user(
+            username='writer', email='writer@ya.ru', password='pass'
+        )
+
+    def reset(self, email):
+        return self.client.post(
+            reverse('users:password_reset_form'), {'email': email}
+        )
+
+    @override_settings(
+        EMAIL_BACKEND='core.backends.mail.QueuedEmailBackend',
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        TASKS_EAGER=False
+    )
+    def test_reset_email_is_sent_by_worker(self):
+        response = self.reset('reader@ya.ru')
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Mail.objects.count(), 1)
+        call_command('run_tasks', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@ya.ru'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
+
+    @override_settings(PASSWORD_RESET_RATE_LIMIT=2)
+    def test_resets_are_limited_per_address(self):
+        for _ in range(3):
+            response = self.reset('Reader@ya.ru')
+            self.assertRedirects(
+                response, reverse('users:password_reset_done')
+            )
+        self.assertEqual(len(mail.outbox), 2)
+        self.reset('writer@ya.ru')
+        self.assertEqual(mail.outbox[-1].to, ['writer@ya.ru'])
+
+    @override_settings(PASSWORD_RESET_RATE_LIMIT=2)
+    def test_limit_is_shared_between_processes(self):
+        """Запросы, учтённые другим процессом, видны сразу."""
+        self.reset('reader@ya.ru')
+        # Другой процесс со своим ближним кешем.
+        with mock.patch.object(
+            caches['default'], 'near', LocMemCache('other-process', {})
+        ):
+            self.reset('reader@ya.ru')
+        self.reset('reader@ya.ru')
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(PASSWORD_RESET_RATE_LIMIT=1)
+    def test_limit_lasts_whole_window(self):
+        """Лимит держится весь PASSWORD_RESET_RATE_WINDOW в кеше сайта."""
+        now = time.time()
+        with mock.patch('time.time', return_value=now):
+            self.reset('reader@ya.ru')
+            self.reset('reader@ya.ru')
+        self.assertEqual(len(mail.outbox), 1)
+        with mock.patch('time.time', return_value=now + 30 * 60):
+            self.reset('reader@ya.ru')
+        self.assertEqual(len(mail.outbox), 1)
+        with mock.patch('time.time', return_value=now + 61 * 60):
+            self.reset('reader@ya.ru')
+        self.assertEqual(len(mail.outbox), 2)
@@ -11,6 +11,7 @@ from django.contrib.auth.views import LogoutView, LoginView, \
 from django.urls import path
 
 from . import views
+from .forms import ResetForm
 
 app_name = 'users'
 
@@ -38,7 +39,8 @@ urlpatterns = [
          name='password_change_done'),
     path('password_reset/',
          PasswordResetView.as_view(
-             template_name='users/password_reset_form.html'
+             template_name='users/password_reset_form.html',
+             form_class=ResetForm
          ),
          name='password_reset_form'),
     path('password_reset/done/',
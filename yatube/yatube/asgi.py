@@ -0,0 +1,27 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 не обслуживает ASGI сам, поэтому WSGI-приложение
+оборачивается адаптером из пакета asgiref (есть в requirements.txt):
+каждый запрос выполняется в пуле потоков, а соединения держит
+ASGI-сервер, например:
+    uvicorn yatube.asgi:application --workers 4
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.wsgi import get_wsgi_application
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError as error:
+    raise ImproperlyConfigured(
+        'Для запуска через ASGI нужен пакет asgiref.'
+    ) from error
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WsgiToAsgi(get_wsgi_application())
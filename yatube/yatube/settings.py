@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -53,7 +57,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,9 +99,63 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, а не открывается на каждый.
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# Настройки каждого нового соединения с SQLite (см. core/sqlite.py).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
+
+# Реплики только для чтения: пути к копиям базы SQLite через запятую
+# в YATUBE_REPLICA_DATABASES. Запись всегда идёт в default, а после
+# записи пользователь REPLICA_PIN_SECONDS секунд читает из default.
+DATABASE_REPLICAS = []
+
+for number, path in enumerate(
+    filter(None, os.environ.get('YATUBE_REPLICA_DATABASES', '').split(',')),
+    start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+REPLICA_PIN_SECONDS = 15
+
+# Потоки для одновременного выполнения независимых запросов к базе
+# на одной странице (см. core/concurrency.py); 0 — по очереди.
+# С локальным файлом SQLite выигрыша нет (запросы короче переключения
+# потоков), поэтому по умолчанию выключено; для сетевой базы
+# проверьте: python manage.py benchmark_views --wsgi --query-workers 4
+CONCURRENT_QUERY_WORKERS = 0
+
+# Очередь фоновых задач (core/tasks.py). Без переменной окружения
+# YATUBE_TASK_QUEUE задачи выполняются сразу в запросе, как раньше;
+# с ней они копятся в таблице и их выполняет отдельно запущенная
+# команда: python manage.py run_tasks --processes 2
+# Упавшая задача повторяется через TASKS_RETRY_SECONDS, 2 *
+# TASKS_RETRY_SECONDS и т. д., всего TASKS_MAX_ATTEMPTS попыток.
+# Задачи исполнителя, не закончившего их за TASKS_LEASE_SECONDS,
+# отдаются другим исполнителям.
+TASKS_EAGER = not os.environ.get('YATUBE_TASK_QUEUE')
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_SECONDS = 10
+TASKS_LEASE_SECONDS = 5 * 60
+TASKS_POLL_SECONDS = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -141,12 +201,79 @@ LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь (core/backends/mail.py) и отправляются
+# фоновой задачей пачками по EMAIL_BATCH_SIZE через одно соединение
+# бэкенда EMAIL_DELIVERY_BACKEND. Без YATUBE_EMAIL_HOST письма пишутся
+# в файлы EMAIL_FILE_PATH; с ним уходят по SMTP на EMAIL_HOST:EMAIL_PORT.
+# Без очереди задач (TASKS_EAGER) письма отправляются после фиксации
+# транзакции запроса, а ошибка почтового сервера только пишется в лог.
+# Для разработки есть отладочный сервер, сохраняющий письма в файлы:
+# python manage.py smtp_debug_server
+EMAIL_BACKEND = 'core.backends.mail.QueuedEmailBackend'
+
+EMAIL_DELIVERY_BACKEND = (
+    'django.core.mail.backends.smtp.EmailBackend'
+    if os.environ.get('YATUBE_EMAIL_HOST')
+    else 'django.core.mail.backends.filebased.EmailBackend'
+)
+
+EMAIL_HOST = os.environ.get('YATUBE_EMAIL_HOST', 'localhost')
+
+EMAIL_PORT = int(os.environ.get('YATUBE_EMAIL_PORT', 1025))
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+EMAIL_BATCH_SIZE = 50
+
+# Не больше PASSWORD_RESET_RATE_LIMIT писем сброса пароля на один адрес
+# за PASSWORD_RESET_RATE_WINDOW секунд; лишние запросы молча
+# пропускаются, чтобы по ответу нельзя было узнать, есть ли адрес.
+# Счётчики хранятся в общем кеше PASSWORD_RESET_RATE_CACHE без
+# ближнего кеша процесса, чтобы лимит был общим для всех процессов.
+PASSWORD_RESET_RATE_LIMIT = 3
+
+PASSWORD_RESET_RATE_WINDOW = 60 * 60
+
+PASSWORD_RESET_RATE_CACHE = 'shared'
+
 NUMBER_OF_RECORDS = 10
 
+COMMENTS_PER_PAGE = 20
+
+# Наибольший размер страницы JSON API (параметр ?limit=).
+API_MAX_PAGE_SIZE = 100
+
+# Миниатюры картинок постов строятся в фоновом пуле потоков;
+# при POSTS_THUMBNAIL_WORKERS = 0 — сразу в запросе.
+# Форматы, которые не поддерживает установленный Pillow, пропускаются.
+POSTS_THUMBNAIL_SIZES = ((960, 339), (640, 226), (320, 113))
+POSTS_THUMBNAIL_FORMATS = ('avif', 'webp', 'jpeg')
+POSTS_THUMBNAIL_WORKERS = 2
+
+# Ограничения на загружаемые картинки постов.
+POSTS_IMAGE_MAX_BYTES = 5 * 1024 * 1024
+POSTS_IMAGE_MAX_PIXELS = 40_000_000
+
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandlers.LimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Посты авторов, у которых подписчиков больше этого числа,
+# не раскладываются по лентам, а подмешиваются при чтении.
+FEED_FANOUT_LIMIT = 1000
+
+# Бэкенд полнотекстового поиска по постам и предел числа результатов.
+# Для баз без FTS5: 'posts.search.DatabaseSearchBackend'.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTS5Backend'
+POSTS_SEARCH_MAX_RESULTS = 500
+
+# Сколько новых постов отдают запросы "посты новее курсора"
+# (/since/, /follow/since/); если новых больше, клиенту лучше
+# загрузить ленту заново.
+POSTS_SINCE_LIMIT = 50
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # Static files (CSS, JavaScript, Images)
@@ -155,12 +282,88 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Общий для всех процессов кеш: Redis, если задан REDIS_URL,
+# иначе файловый кеш во временном каталоге (для разработки).
+# Перед ним стоит ближний кеш в памяти процесса.
+# Тесты очищают кеш, поэтому каждый запуск тестов получает
+# свой каталог и не трогает ни кеш сервера разработки, ни Redis.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+REDIS_URL = None if TESTING else os.environ.get('REDIS_URL')
+
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-test-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+else:
+    CACHE_DIR = os.environ.get(
+        'YATUBE_CACHE_DIR',
+        os.path.join(tempfile.gettempdir(), 'yatube-cache')
+    )
+
+if REDIS_URL:
+    SHARED_CACHE = {
+        'BACKEND': 'core.backends.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+
 CACHES = {
     'default': {
+        'BACKEND': 'core.backends.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'NEAR_TIMEOUT': 5,
+            'NEAR_MAX_ENTRIES': 1000,
+        },
+    },
+    'shared': SHARED_CACHE,
+    # Страницы лент подписок; при переполнении вытесняются
+    # давно не читанные (в Redis — при maxmemory-policy allkeys-lru).
+    'feeds': {
+        'BACKEND': 'core.backends.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'feeds',
+        'TIMEOUT': 10 * 60,
+    } if REDIS_URL else {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'LOCATION': 'feeds',
+        'TIMEOUT': 10 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
+POSTS_FEED_CACHE = 'feeds'
+
+# Поток уведомлений о новых постах подписок (posts/events.py).
+# Каждая открытая лента подписок держит поток WSGI-сервера до
+# SSE_MAX_SECONDS, поэтому уведомления включаются переменной окружения
+# YATUBE_SSE только там, где потоков хватает на всех читателей.
+# Поток закрывается через SSE_MAX_SECONDS, пустые строки-пинги
+# идут каждые SSE_HEARTBEAT_SECONDS, браузер переподключается
+# через SSE_RETRY_MS миллисекунд.
+SSE_ENABLED = bool(os.environ.get('YATUBE_SSE'))
+SSE_MAX_SECONDS = 5 * 60
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 3000
+
+# Замеры запросов (core/metrics.py) на странице /metrics/: её видят
+# сотрудники и сборщик с заголовком "Authorization: Bearer <токен>".
+# Запросы дольше METRICS_SLOW_REQUEST_MS пишутся в журнал core.metrics
+# вместе с первыми METRICS_SLOW_SQL_LIMIT запросами к базе.
+METRICS_ENABLED = True
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_SQL_LIMIT = 50
+
 INTERNAL_IPS = [
     '127.0.0.1',
 ]